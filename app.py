@@ -1,5 +1,6 @@
 import sys
 import os
+import time
 
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')
@@ -7,6 +8,7 @@ if sys.platform == 'win32':
     os.environ['PYTHONIOENCODING'] = 'utf-8'
     os.environ['PGCLIENTENCODING'] = 'UTF8'
 
+import click
 from flask import Flask, render_template
 from flask_cors import CORS
 from controllers.book_controller import book_bp
@@ -14,7 +16,11 @@ from controllers.chat_controller import chat_bp
 from controllers.auth_controller import auth_bp
 from controllers.favorite_controller import favorite_bp
 from controllers.rating_controller import rating_bp
-from data.db import init_db
+from controllers.cover_controller import cover_bp
+from controllers.leaderboard_controller import leaderboard_bp
+from controllers.recommendation_controller import recommendation_bp
+from data.db import init_db, SessionLocal
+from services.catalog_service import CatalogService
 
 app = Flask(__name__)
 CORS(app)
@@ -22,6 +28,9 @@ CORS(app)
 if not os.environ.get('GROQ_API_KEY'):
     os.environ['GROQ_API_KEY'] = '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'
 
+if not os.environ.get('SECRET_KEY'):
+    print("[AVISO] SECRET_KEY não configurada: o login fica desabilitado até ela ser definida")
+
 if 'HUGGINGFACE_API_KEY' in os.environ:
     print("[DEBUG] Removendo HUGGINGFACE_API_KEY do ambiente")
     del os.environ['HUGGINGFACE_API_KEY']
@@ -32,6 +41,157 @@ app.register_blueprint(chat_bp)
 app.register_blueprint(auth_bp)
 app.register_blueprint(favorite_bp)
 app.register_blueprint(rating_bp)
+app.register_blueprint(cover_bp)
+app.register_blueprint(leaderboard_bp)
+app.register_blueprint(recommendation_bp)
+
+@app.cli.command('catalog-rebuild')
+def catalog_rebuild():
+    total = CatalogService.rebuild()
+    print(f"[INFO] Catálogo local reindexado: {total} livros")
+
+
+@app.cli.command('ratings-rebuild-stats')
+def ratings_rebuild_stats():
+    from services.rating_service import RatingService
+    service = RatingService(SessionLocal())
+    try:
+        total = service.reconstruir_estatisticas()
+        print(f"[INFO] Estatísticas de avaliações reconstruídas: {total} livros")
+    finally:
+        service.db.close()
+
+
+@app.cli.command('leaderboards-rebuild')
+def leaderboards_rebuild():
+    from services.leaderboard_service import LeaderboardService
+    LeaderboardService.reconstruir()
+    print("[INFO] Rankings reconstruídos")
+
+
+@app.cli.command('recommendations-refresh')
+@click.option('--full', 'completo', is_flag=True, help='Recalcula todos os livros, não só os pendentes.')
+def recommendations_refresh(completo):
+    from services.recommendation_service import RecommendationService
+    inicio = time.perf_counter()
+    total = RecommendationService.atualizar(completo=completo)
+    print(f"[INFO] Vizinhos recalculados: {total} livros em {time.perf_counter() - inicio:.2f}s")
+
+
+@app.cli.command('recommendations-benchmark')
+@click.option('--interactions', 'interacoes', default=1_000_000, show_default=True)
+@click.option('--users', 'usuarios', default=100_000, show_default=True)
+@click.option('--books', 'livros', default=50_000, show_default=True)
+@click.option('--changed', 'alterados', default=500, show_default=True, help='Livros marcados para o passo incremental.')
+def recommendations_benchmark(interacoes, usuarios, livros, alterados):
+    """Mede carga, montagem da matriz e atualizações completa e incremental com dados
+    sintéticos gravados num banco SQLite temporário (o banco da aplicação não é tocado)."""
+    import tempfile
+    import numpy as np
+    from sqlalchemy import create_engine, text
+    from data.db import Base, engine
+    from services.recommendation_service import RecommendationService
+
+    rng = np.random.default_rng(42)
+    # Popularidade dos livros com cauda longa, como no catálogo real
+    popularidade = 1 / np.arange(1, livros + 1) ** 0.8
+    pares = np.unique(np.column_stack((
+        rng.integers(0, usuarios, interacoes),
+        rng.choice(livros, interacoes, p=popularidade / popularidade.sum())
+    )), axis=0)
+    # Um quinto das interações vira favorito, o resto avaliação de 1 a 5 estrelas
+    favorito = rng.random(len(pares)) < 0.2
+    estrelas = rng.integers(1, 6, len(pares))
+
+    with tempfile.TemporaryDirectory() as pasta:
+        banco = create_engine(f"sqlite:///{os.path.join(pasta, 'benchmark.db')}")
+        Base.metadata.create_all(banco)
+        with banco.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO avaliacoes (id, google_books_id, usuario_id, estrelas) VALUES (?, ?, ?, ?)",
+                [(str(i), f"livro{livro}", f"usuario{usuario}", int(nota))
+                 for i, ((usuario, livro), nota) in enumerate(zip(pares[~favorito].tolist(), estrelas[~favorito]))]
+            )
+            conn.exec_driver_sql(
+                "INSERT INTO favoritos (usuario_id, google_books_id) VALUES (?, ?)",
+                [(f"usuario{usuario}", f"livro{livro}") for usuario, livro in pares[favorito].tolist()]
+            )
+
+        SessionLocal.configure(bind=banco)
+        try:
+            session = SessionLocal()
+            try:
+                inicio = time.perf_counter()
+                dados = RecommendationService._carregar_interacoes(session)
+                carga = time.perf_counter() - inicio
+            finally:
+                session.close()
+
+            inicio = time.perf_counter()
+            matriz, _ = RecommendationService.montar_matriz(*dados)
+            montagem = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            RecommendationService.atualizar(completo=True)
+            completo = time.perf_counter() - inicio
+
+            marcados = rng.choice(livros, min(alterados, livros), replace=False)
+            with banco.begin() as conn:
+                conn.execute(
+                    text("INSERT OR IGNORE INTO recomendacoes_pendentes (google_books_id, marcado_em) VALUES (:livro, 0)"),
+                    [{'livro': f"livro{livro}"} for livro in marcados.tolist()]
+                )
+            inicio = time.perf_counter()
+            recalculados = RecommendationService.atualizar()
+            incremental = time.perf_counter() - inicio
+        finally:
+            SessionLocal.configure(bind=engine)
+            banco.dispose()
+
+    print(f"[INFO] Matriz {matriz.shape[0]} x {matriz.shape[1]}, {matriz.nnz} interações")
+    print(f"[INFO] Carga das interações do banco: {carga:.2f}s")
+    print(f"[INFO] Montagem da matriz: {montagem:.2f}s")
+    print(f"[INFO] Atualização completa (carga, matriz, vizinhos e gravação): {completo:.2f}s")
+    print(f"[INFO] Atualização incremental ({len(marcados)} livros marcados, {recalculados} recalculados): {incremental:.2f}s")
+
+
+@app.cli.command('ratings-import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'formato', type=click.Choice(['csv', 'ndjson']), help='Padrão: pela extensão do arquivo.')
+@click.option('--batch-size', default=1000, show_default=True)
+def ratings_import(path, formato, batch_size):
+    from services.rating_service import RatingService
+    from services.rating_io import detectar_formato, ler_linhas
+
+    service = RatingService(SessionLocal())
+    try:
+        with open(path, encoding='utf-8', newline='') as arquivo:
+            resultado = service.importar_avaliacoes(
+                ler_linhas(arquivo, detectar_formato(path, formato)),
+                tamanho_lote=batch_size
+            )
+    finally:
+        service.db.close()
+
+    for erro in resultado['erros']:
+        click.echo(f"[ERRO] linha {erro['linha']}: {erro['erro']}", err=True)
+    print(f"[INFO] Avaliações importadas: {resultado['importadas']}; linhas com erro: {len(resultado['erros'])}")
+
+
+@app.cli.command('ratings-export')
+@click.option('--format', 'formato', type=click.Choice(['csv', 'ndjson']), default='ndjson', show_default=True)
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8', lazy=True), default='-')
+def ratings_export(formato, output):
+    from services.rating_service import RatingService
+    from services.rating_io import escrever_linhas
+
+    service = RatingService(SessionLocal())
+    try:
+        for linha in escrever_linhas(service.exportar_avaliacoes(), formato):
+            output.write(linha)
+    finally:
+        service.db.close()
+
 
 @app.route('/')
 def index():
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from data.db import SessionLocal, User
-from services.session_manager import login_user, logout_user, get_logged_users, is_logged_in
+from services.session_manager import login_user, logout_user
+from services.auth_service import authenticate_user, verify_token, token_from_header, forget_token, get_profile
+from exceptions.custom_exceptions import APIException
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -53,81 +55,53 @@ def login():
     if not username_or_email or not password:
         return jsonify({'error': 'Email e senha são obrigatórios'}), 400
 
-    session = SessionLocal()
     try:
-        user = session.query(User).filter(
-            (User.username == username_or_email) | (User.email == username_or_email)
-        ).first()
-
-        if not user or user.password != password:
-            return jsonify({'error': 'Email ou senha incorretos'}), 401
+        user = authenticate_user(username_or_email, password)
+    except APIException as e:
+        return jsonify({'error': e.message}), e.status_code
+    if not user:
+        return jsonify({'error': 'Email ou senha incorretos'}), 401
 
-        user_id = str(user.id)
-
-        login_user(user_id)
-
-        return jsonify({
-            'message': 'Login realizado com sucesso',
-            'user_id': user_id,
-            'username': user.username,
-            'email': user.email
-        }), 200
+    login_user(user['user_id'])
 
-    finally:
-        session.close()
+    return jsonify({
+        'message': 'Login realizado com sucesso',
+        'user_id': user['user_id'],
+        'username': user['username'],
+        'email': user['email'],
+        'token': user['token']
+    }), 200
 
 
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
-    data = request.get_json() or {}
-    user_id = data.get('user_id')
+    token = token_from_header(request.headers.get('Authorization', ''))
 
-    if not user_id:
-        return jsonify({'error': 'Parece que houve um erro ao tentar fazer logout.'}), 400
+    # O logout revoga todos os tokens do usuário, então só vale com um token válido dele
+    claims = verify_token(token) if token else None
+    if not claims:
+        return jsonify({'error': 'Sessão não encontrada. Faça login novamente.'}), 401
 
-    logout_user(user_id)
+    forget_token(token)
+    logout_user(claims['user_id'])
 
     return jsonify({'message': 'Logout realizado com sucesso'}), 200
 
 
 @auth_bp.route('/me', methods=['GET'])
 def me():
-    auth_header = request.headers.get('Authorization', '')
-    user_id = None
+    token = token_from_header(request.headers.get('Authorization', ''))
 
-    if auth_header.startswith('Bearer '):
-        user_id = auth_header.split(' ', 1)[1].strip()
-    elif auth_header:
-        user_id = auth_header
-    else:
-        user_id = request.args.get('user_id')
-
-    if not user_id:
+    if not token:
         return jsonify({'error': 'Sessão não encontrada. Faça login novamente.'}), 401
 
-    if not is_logged_in(user_id):
+    claims = verify_token(token)
+    if not claims:
         return jsonify({'error': 'Sessão expirada. Faça login novamente.'}), 401
 
-    session = SessionLocal()
-    try:
-        user = session.query(User).filter(User.id == user_id).first()
-
-        if not user:
-            return jsonify({'error': 'Usuário não encontrado'}), 404
-
-        return jsonify({
-            'username': user.username,
-            'email': user.email,
-            'user_id': str(user.id)
-        }), 200
+    profile = get_profile(claims['user_id'])
+    if not profile:
+        return jsonify({'error': 'Usuário não encontrado'}), 404
 
-    finally:
-        session.close()
+    return jsonify(profile), 200
 
-
-@auth_bp.route('/status', methods=['GET'])
-def status():
-    return jsonify({
-        'logged_users': get_logged_users(),
-        'total': len(get_logged_users())
-    }), 200
\ No newline at end of file
@@ -1,6 +1,7 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from services.book_service import BookService
-from exceptions.custom_exceptions import BadRequestException
+from exceptions.custom_exceptions import BadRequestException, APIException
 
 book_bp = Blueprint('book_bp', __name__)
 
@@ -10,20 +11,78 @@ def search_books():
     try:
         body = request.get_json() or {}
         query = body.get('findBook')
-        books = BookService.search_books(query)
-        return jsonify(books)
+        start_index = body.get('startIndex', 0)
+        limit = body.get('limit')
+        fields = body.get('fields')
+        source = body.get('source', 'upstream')
+
+        if source not in BookService.SEARCH_SOURCES:
+            raise BadRequestException(f"'source' deve ser um de: {', '.join(BookService.SEARCH_SOURCES)}.")
+
+        if source == 'local':
+            return jsonify(BookService.search_books_local(query, start_index, limit, fields))
+        if source == 'local_first':
+            return jsonify(BookService.search_books_local_first(query, start_index, limit, fields))
+
+        if body.get('stream'):
+            books = BookService.iter_search_books(query, start_index, limit, fields)
+            lines = (json.dumps(item, ensure_ascii=False) + '\n' for item in books)
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+        books = BookService.search_books(query, start_index, limit, fields)
+        response = jsonify(books)
+        response.headers['X-Upstream-State'] = BookService.books_breaker.state
+        return response
     except BadRequestException as e:
         return jsonify({"error": e.message}), 400
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@book_bp.route('/api/books/batch', methods=['POST'])
+def get_books_batch():
+    try:
+        body = request.get_json() or {}
+        result = BookService.search_books_by_ids(
+            body.get('ids'),
+            include_avaliacoes=body.get('include_avaliacoes', False),
+            fields=body.get('fields'),
+            avaliacoes_limite=body.get('avaliacoes_limite')
+        )
+        return jsonify(result)
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@book_bp.route('/api/books/cache/stats', methods=['GET'])
+def search_cache_stats():
+    return jsonify(BookService.search_cache.stats()), 200
+
+
+@book_bp.route('/api/books/upstream/status', methods=['GET'])
+def upstream_status():
+    return jsonify(BookService.books_breaker.snapshot()), 200
+
+
 @book_bp.route('/api/books/<book_id>', methods=['GET'])
 def get_book(book_id):
     try:
-        books = BookService.search_books_by_id(book_id)
+        books = BookService.search_books_by_id(
+            book_id,
+            request.args.get('fields'),
+            avaliacoes_limite=request.args.get('limite', type=int),
+            avaliacoes_cursor=request.args.get('cursor')
+        )
         return jsonify(books)
     except BadRequestException as e:
         return jsonify({"error": e.message}), 400
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -1,11 +1,18 @@
 import os
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from services.chat_service import ChatService
+from services.chat_cache import ChatCache
 from exceptions.custom_exceptions import BadRequestException, APIException
 
 chat_bp = Blueprint('chat_bp', __name__)
 
 
+@chat_bp.route('/api/chat/cache/stats', methods=['GET'])
+def chat_cache_stats():
+    return jsonify(ChatCache.stats()), 200
+
+
 @chat_bp.route('/api/chat', methods=['POST'])
 def chat():
     body = request.get_json() or {}
@@ -18,7 +25,12 @@ def chat():
     api_key = request.headers.get('X-OpenAI-Key') or body.get('api_key')
     model = request.headers.get('X-OpenAI-Model') or body.get('model')
 
+    wants_stream = body.get('stream') or 'text/event-stream' in request.headers.get('Accept', '')
+
     try:
+        if wants_stream:
+            return _sse_response(ChatService.stream(message, api_key=api_key, model=model))
+
         answer = ChatService.ask(message, api_key=api_key, model=model)
         return jsonify(answer)
     except BadRequestException as e:
@@ -26,4 +38,27 @@ def chat():
     except APIException as e:
         return jsonify({"error": e.message}), getattr(e, 'status_code', 500)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+def _sse_event(data, event=None):
+    prefix = f"event: {event}\n" if event else ''
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _sse_response(chunks):
+    """Repassa os trechos da resposta como Server-Sent Events: um evento `delta` por
+    trecho e `done` no fim; falhas depois de aberto o stream viram um evento `error`."""
+    def generate():
+        try:
+            for chunk in chunks:
+                yield _sse_event({"delta": chunk})
+            yield _sse_event({}, event='done')
+        except Exception as e:
+            yield _sse_event({"error": str(e)}, event='error')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,39 @@
+import os
+from flask import Blueprint, jsonify, send_file
+from services.book_service import BookService
+from services.cover_service import CoverService
+from exceptions.custom_exceptions import BadRequestException, APIException
+
+cover_bp = Blueprint('cover_bp', __name__)
+
+# A URL /covers/<id>/<tamanho> não muda quando a capa é baixada de novo, então ela não pode
+# ser "immutable"; passado o max_age o navegador revalida com o ETag (sha256) e recebe 304
+COVER_MAX_AGE = int(os.environ.get('COVER_MAX_AGE', 24 * 3600))
+
+
+@cover_bp.route('/covers/<book_id>/<size>', methods=['GET'])
+def get_cover(book_id, size):
+    try:
+        if size not in BookService.IMAGE_LINK_SIZES:
+            raise BadRequestException("Tamanho de capa inválido.")
+
+        cover = CoverService.get_cover(book_id, size, lambda: BookService.get_cover_url(book_id, size))
+
+        if not cover:
+            return jsonify({"error": "Capa não encontrada."}), 404
+
+        response = send_file(
+            cover['path'],
+            mimetype=cover['content_type'],
+            max_age=COVER_MAX_AGE,
+            etag=cover['etag'],
+            conditional=True
+        )
+        response.cache_control.public = True
+        return response
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
+    except APIException as e:
+        return jsonify({"error": e.message}), e.status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,20 +1,33 @@
 from flask import Blueprint, request, jsonify
 from services.favorite_service import FavoriteService
-from services.session_manager import is_logged_in
+from services.auth_service import verify_token, token_from_header
 from exceptions.custom_exceptions import BadRequestException
 
 favorite_bp = Blueprint('favorite_bp', __name__)
 
 
 def check_logged_in(user_id):
-    if not is_logged_in(user_id):
+    claims = verify_token(token_from_header(request.headers.get('Authorization', '')))
+    if not claims:
         return jsonify({
             'error': 'Você não está logado. Faça login primeiro.',
             'code': 'NOT_LOGGED_IN'
         }), 401
+
+    if claims['user_id'] != user_id:
+        return jsonify({
+            'error': 'Você não tem permissão para acessar os dados de outro usuário.',
+            'code': 'FORBIDDEN'
+        }), 403
+
     return None
 
 
+@favorite_bp.route('/api/favorites/cache/stats', methods=['GET'])
+def favorites_cache_stats():
+    return jsonify(FavoriteService.cache.stats()), 200
+
+
 @favorite_bp.route('/api/users/<user_id>/favorites', methods=['POST'])
 def add_favorite(user_id):
     auth_error = check_logged_in(user_id)
@@ -78,4 +91,42 @@ def check_favorite(user_id, book_id):
     except BadRequestException as e:
         return jsonify({"error": e.message}), 400
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@favorite_bp.route('/api/users/<user_id>/favorites/check', methods=['POST'])
+def check_favorites(user_id):
+    """Quais dos livros de `book_ids` estão nos favoritos (ex.: cards de uma busca)"""
+    auth_error = check_logged_in(user_id)
+    if auth_error:
+        return auth_error
+
+    try:
+        body = request.get_json() or {}
+        book_ids = body.get('book_ids')
+
+        if book_ids is None:
+            raise BadRequestException("O campo 'book_ids' é obrigatório.")
+
+        favorited = FavoriteService.check_favorites(user_id, book_ids)
+        return jsonify({"favorited": favorited}), 200
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@favorite_bp.route('/api/users/<user_id>/favorites/batch', methods=['POST'])
+def update_favorites(user_id):
+    auth_error = check_logged_in(user_id)
+    if auth_error:
+        return auth_error
+
+    try:
+        body = request.get_json() or {}
+        result = FavoriteService.update_favorites(user_id, add=body.get('add'), remove=body.get('remove'))
+        return jsonify(result), 200
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,21 @@
+from flask import Blueprint, request, jsonify
+from services.leaderboard_service import LeaderboardService
+from exceptions.custom_exceptions import BadRequestException
+
+leaderboard_bp = Blueprint('leaderboard_bp', __name__)
+
+
+@leaderboard_bp.route('/api/leaderboards/<tipo>', methods=['GET'])
+def obter_ranking(tipo):
+    try:
+        ranking = LeaderboardService.obter_ranking(
+            tipo,
+            periodo=request.args.get('periodo', 'geral'),
+            limite=request.args.get('limite', 20, type=int),
+            offset=request.args.get('offset', 0, type=int)
+        )
+        return jsonify(ranking), 200
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
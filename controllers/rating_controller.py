@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from exceptions.custom_exceptions import BadRequestException
 from data.db import SessionLocal
-from services.session_manager import is_logged_in
+from services.auth_service import verify_token, token_from_header
 
 rating_bp = Blueprint('rating_bp', __name__)
 
@@ -18,12 +18,19 @@ def check_logged_in(user_id):
             'code': 'MISSING_USER_ID'
         }), 400
 
-    if not is_logged_in(user_id):
+    claims = verify_token(token_from_header(request.headers.get('Authorization', '')))
+    if not claims:
         return jsonify({
             'error': 'Você não está logado. Faça login primeiro.',
             'code': 'NOT_LOGGED_IN'
         }), 401
 
+    if claims['user_id'] != user_id:
+        return jsonify({
+            'error': 'Você não tem permissão para acessar os dados de outro usuário.',
+            'code': 'FORBIDDEN'
+        }), 403
+
     return None
 
 
@@ -100,21 +107,28 @@ def remover_avaliacao(google_books_id):
 
 @rating_bp.route('/api/ratings/user/<user_id>', methods=['GET'])
 def listar_avaliacoes_usuario(user_id):
-    """Lista todas as avaliações de um usuário"""
+    """Lista as avaliações de um usuário, paginadas por cursor"""
     service = get_rating_service()
     try:
         auth_error = check_logged_in(user_id)
         if auth_error:
             return auth_error
 
-        avaliacoes = service.obter_avaliacoes_usuario(user_id)
+        pagina = service.obter_avaliacoes_usuario(
+            user_id,
+            limite=request.args.get('limite', type=int),
+            cursor=request.args.get('cursor')
+        )
 
         return jsonify({
             "user_id": user_id,
-            "ratings": avaliacoes,
-            "total": len(avaliacoes)
+            "ratings": pagina['avaliacoes'],
+            "total": len(pagina['avaliacoes']),
+            "next_cursor": pagina['next_cursor']
         }), 200
 
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
@@ -140,20 +154,44 @@ def obter_estatisticas(google_books_id):
         service.db.close()
 
 
+@rating_bp.route('/api/ratings/stats/batch', methods=['POST'])
+def obter_estatisticas_lote():
+    service = get_rating_service()
+    try:
+        body = request.get_json() or {}
+
+        stats = service.obter_estatisticas_lote(body.get('google_books_ids'))
+
+        return jsonify({
+            "stats": stats,
+            "total": len(stats)
+        }), 200
+
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        service.db.close()
+
+
 @rating_bp.route('/api/ratings/<google_books_id>', methods=['GET'])
 def listar_avaliacoes(google_books_id):
     service = get_rating_service()
     try:
         limite = request.args.get('limite', 10, type=int)
 
-        avaliacoes = service.obter_avaliacoes(google_books_id, limite)
+        pagina = service.obter_avaliacoes(google_books_id, limite, request.args.get('cursor'))
 
         return jsonify({
             "google_books_id": google_books_id,
-            "avaliacoes": avaliacoes,
-            "total": len(avaliacoes)
+            "avaliacoes": pagina['avaliacoes'],
+            "total": len(pagina['avaliacoes']),
+            "next_cursor": pagina['next_cursor']
         }), 200
 
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
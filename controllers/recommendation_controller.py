@@ -0,0 +1,43 @@
+from flask import Blueprint, request, jsonify
+from services.recommendation_service import RecommendationService
+from services.auth_service import verify_token, token_from_header
+from exceptions.custom_exceptions import BadRequestException
+
+recommendation_bp = Blueprint('recommendation_bp', __name__)
+
+
+@recommendation_bp.route('/api/books/<book_id>/similar', methods=['GET'])
+def livros_similares(book_id):
+    try:
+        result = RecommendationService.obter_similares(book_id, limite=request.args.get('limite', type=int))
+        return jsonify(result), 200
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@recommendation_bp.route('/api/users/<user_id>/recommendations', methods=['GET'])
+def recomendacoes_usuario(user_id):
+    claims = verify_token(token_from_header(request.headers.get('Authorization', '')))
+    if not claims:
+        return jsonify({
+            'error': 'Você não está logado. Faça login primeiro.',
+            'code': 'NOT_LOGGED_IN'
+        }), 401
+
+    if claims['user_id'] != user_id:
+        return jsonify({
+            'error': 'Você não tem permissão para acessar os dados de outro usuário.',
+            'code': 'FORBIDDEN'
+        }), 403
+
+    try:
+        result = RecommendationService.obter_recomendacoes_usuario(
+            user_id, limite=request.args.get('limite', type=int)
+        )
+        return jsonify(result), 200
+    except BadRequestException as e:
+        return jsonify({"error": e.message}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
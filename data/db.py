@@ -1,7 +1,9 @@
 from sqlalchemy import create_engine, Column, String, TIMESTAMP, text, Text, Integer, UniqueConstraint, CheckConstraint, \
-    ForeignKey, JSON
+    ForeignKey, JSON, Float, Index, event
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+import json
 import uuid
+import hashlib
 
 # Alterado para usar SQLite local em vez de PostgreSQL
 DATABASE_URL = "sqlite:///./biblioteca.db"
@@ -12,6 +14,17 @@ SessionLocal = sessionmaker(bind=engine)
 Base = declarative_base()
 
 
+@event.listens_for(engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # O SQLite só valida chaves estrangeiras quando ativado por conexão;
+    # o upsert de avaliações depende disso para rejeitar usuários inexistentes
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    # WAL deixa leitores de vários processos (workers do gunicorn) rodarem junto com um escritor
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.close()
+
+
 class User(Base):
     __tablename__ = 'users'
     # Armazenar UUIDs como strings para compatibilidade com SQLite
@@ -19,18 +32,42 @@ class User(Base):
     username = Column(String(150), unique=True, nullable=False)
     email = Column(String(255), unique=True, nullable=False)
     password = Column(String(255), nullable=False)
-    # Usar JSON genérico do SQLAlchemy (funciona como TEXT em SQLite)
-    favorite_books = Column(JSON, default=list)
     created_at = Column(TIMESTAMP, server_default=text('CURRENT_TIMESTAMP'))
 
     avaliacoes = relationship('Avaliacao', back_populates='usuario', cascade='all, delete-orphan')
+    favoritos = relationship('Favorito', cascade='all, delete-orphan', order_by='Favorito.id')
+
+
+class Favorito(Base):
+    __tablename__ = 'favoritos'
+    __table_args__ = (
+        UniqueConstraint('usuario_id', 'google_books_id', name='uq_favorito_usuario_livro'),
+    )
+
+    # Autoincremento preserva a ordem em que os favoritos foram adicionados
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    usuario_id = Column(String(36), ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    google_books_id = Column(String(50), nullable=False)
+    criado_em = Column(TIMESTAMP, server_default=text('CURRENT_TIMESTAMP'))
+
+
+# Versão dos favoritos de cada usuário, incrementada na mesma transação de toda escrita em
+# favoritos; os caches em memória de cada worker comparam com ela antes de responder
+class FavoritoVersao(Base):
+    __tablename__ = 'favoritos_versoes'
+
+    usuario_id = Column(String(36), primary_key=True)
+    versao = Column(Integer, nullable=False, default=0)
 
 
 class Avaliacao(Base):
     __tablename__ = 'avaliacoes'
     __table_args__ = (
         UniqueConstraint('google_books_id', 'usuario_id', name='uq_livro_usuario'),
-        CheckConstraint('estrelas >= 1 AND estrelas <= 5', name='ck_estrelas_range')
+        CheckConstraint('estrelas >= 1 AND estrelas <= 5', name='ck_estrelas_range'),
+        # Suportam a paginação por cursor em (data_avaliacao, id) das listagens por livro e por usuário
+        Index('ix_avaliacoes_livro_data', 'google_books_id', 'data_avaliacao', 'id'),
+        Index('ix_avaliacoes_usuario_data', 'usuario_id', 'data_avaliacao', 'id')
     )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -43,8 +80,306 @@ class Avaliacao(Base):
     usuario = relationship('User', back_populates='avaliacoes')
 
 
+# Agregados por livro mantidos por triggers na mesma transação de cada escrita em avaliacoes
+class EstatisticaAvaliacao(Base):
+    __tablename__ = 'estatisticas_avaliacoes'
+
+    google_books_id = Column(String(50), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    soma = Column(Integer, nullable=False, default=0)
+    estrelas_1 = Column(Integer, nullable=False, default=0)
+    estrelas_2 = Column(Integer, nullable=False, default=0)
+    estrelas_3 = Column(Integer, nullable=False, default=0)
+    estrelas_4 = Column(Integer, nullable=False, default=0)
+    estrelas_5 = Column(Integer, nullable=False, default=0)
+
+
+def rebuild_rating_stats(session):
+    session.execute(text("DELETE FROM estatisticas_avaliacoes"))
+    session.execute(text(
+        "INSERT INTO estatisticas_avaliacoes "
+        "(google_books_id, total, soma, estrelas_1, estrelas_2, estrelas_3, estrelas_4, estrelas_5) "
+        "SELECT google_books_id, COUNT(*), SUM(estrelas), "
+        "SUM(estrelas = 1), SUM(estrelas = 2), SUM(estrelas = 3), SUM(estrelas = 4), SUM(estrelas = 5) "
+        "FROM avaliacoes GROUP BY google_books_id"
+    ))
+
+
+def _star_columns(sign, ref):
+    return ', '.join(
+        f"estrelas_{i} = estrelas_{i} {sign} ({ref}.estrelas = {i})" for i in range(1, 6)
+    )
+
+
+# Qualquer escrita em avaliacoes (ORM, upsert ou importação em lote) atualiza os agregados no mesmo comando
+RATING_STATS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_avaliacoes_stats_insert AFTER INSERT ON avaliacoes
+    BEGIN
+        INSERT INTO estatisticas_avaliacoes
+            (google_books_id, total, soma, estrelas_1, estrelas_2, estrelas_3, estrelas_4, estrelas_5)
+        VALUES (NEW.google_books_id, 1, NEW.estrelas, NEW.estrelas = 1, NEW.estrelas = 2,
+                NEW.estrelas = 3, NEW.estrelas = 4, NEW.estrelas = 5)
+        ON CONFLICT(google_books_id) DO UPDATE SET
+            total = total + 1, soma = soma + NEW.estrelas, {_star_columns('+', 'NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_avaliacoes_stats_update AFTER UPDATE OF estrelas ON avaliacoes
+    WHEN OLD.estrelas != NEW.estrelas
+    BEGIN
+        UPDATE estatisticas_avaliacoes SET
+            soma = soma - OLD.estrelas + NEW.estrelas, {_star_columns('-', 'OLD')}
+        WHERE google_books_id = OLD.google_books_id;
+        UPDATE estatisticas_avaliacoes SET {_star_columns('+', 'NEW')}
+        WHERE google_books_id = NEW.google_books_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_avaliacoes_stats_delete AFTER DELETE ON avaliacoes
+    BEGIN
+        UPDATE estatisticas_avaliacoes SET
+            total = total - 1, soma = soma - OLD.estrelas, {_star_columns('-', 'OLD')}
+        WHERE google_books_id = OLD.google_books_id;
+        DELETE FROM estatisticas_avaliacoes WHERE google_books_id = OLD.google_books_id AND total <= 0;
+    END
+    """
+]
+
+
+# Livros cujas interações mudaram desde a última atualização das recomendações
+RECOMMENDATION_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_avaliacoes_recomendacoes_insert AFTER INSERT ON avaliacoes
+    BEGIN
+        INSERT INTO recomendacoes_pendentes (google_books_id, marcado_em)
+        VALUES (NEW.google_books_id, (julianday('now') - 2440587.5) * 86400.0)
+        ON CONFLICT(google_books_id) DO UPDATE SET marcado_em = excluded.marcado_em;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_avaliacoes_recomendacoes_update AFTER UPDATE OF estrelas ON avaliacoes
+    WHEN OLD.estrelas != NEW.estrelas
+    BEGIN
+        INSERT INTO recomendacoes_pendentes (google_books_id, marcado_em)
+        VALUES (NEW.google_books_id, (julianday('now') - 2440587.5) * 86400.0)
+        ON CONFLICT(google_books_id) DO UPDATE SET marcado_em = excluded.marcado_em;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_avaliacoes_recomendacoes_delete AFTER DELETE ON avaliacoes
+    BEGIN
+        INSERT INTO recomendacoes_pendentes (google_books_id, marcado_em)
+        VALUES (OLD.google_books_id, (julianday('now') - 2440587.5) * 86400.0)
+        ON CONFLICT(google_books_id) DO UPDATE SET marcado_em = excluded.marcado_em;
+    END
+    """
+]
+
+
+def _init_rating_triggers():
+    with engine.begin() as conn:
+        for ddl in RATING_STATS_TRIGGERS + RECOMMENDATION_TRIGGERS:
+            conn.execute(text(ddl))
+
+
+# Índice de busca textual do catálogo local (FTS5); não é mapeado pelo ORM por ser uma tabela virtual
+CATALOG_FTS_TABLE = 'livros_fts'
+CATALOG_FTS_COLUMNS = ('google_books_id', 'title', 'subtitle', 'authors', 'categories', 'description')
+
+
+def catalog_rowid(google_books_id):
+    """Rowid fixo do livro no índice (hash de 63 bits do ID).
+
+    Coluna UNINDEXED não tem índice, então remover por google_books_id varre a
+    tabela inteira; pelo rowid é uma busca direta. O rowid implícito de
+    livros_cache não serve porque o VACUUM pode renumerá-lo.
+    """
+    digest = hashlib.blake2b(google_books_id.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') >> 1
+
+
+def _migrate_catalog_rowids(conn):
+    # Índices criados antes de catalog_rowid usam rowids sequenciais: regrava as linhas com o rowid fixo
+    primeira = conn.execute(text(f"SELECT rowid, google_books_id FROM {CATALOG_FTS_TABLE} LIMIT 1")).first()
+    if primeira is None or primeira.rowid == catalog_rowid(primeira.google_books_id):
+        return
+
+    colunas = ', '.join(CATALOG_FTS_COLUMNS)
+    linhas = [dict(row._mapping) for row in conn.execute(text(f"SELECT {colunas} FROM {CATALOG_FTS_TABLE}"))]
+    conn.execute(text(f"DELETE FROM {CATALOG_FTS_TABLE}"))
+    for linha in linhas:
+        linha['rowid'] = catalog_rowid(linha['google_books_id'])
+    conn.execute(text(
+        f"INSERT INTO {CATALOG_FTS_TABLE} (rowid, {colunas}) "
+        f"VALUES (:rowid, {', '.join(':' + coluna for coluna in CATALOG_FTS_COLUMNS)})"
+    ), list({linha['rowid']: linha for linha in linhas}.values()))
+
+
+def _init_catalog_index():
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {CATALOG_FTS_TABLE} USING fts5("
+                "google_books_id UNINDEXED, title, subtitle, authors, categories, description, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+            _migrate_catalog_rowids(conn)
+    except Exception as e:
+        print(f"Erro ao criar índice do catálogo (FTS5 indisponível?): {e}")
+
+
+class LivroCache(Base):
+    __tablename__ = 'livros_cache'
+
+    google_books_id = Column(String(50), primary_key=True)
+    # Livro já formatado por BookService._format_book; None quando o Google Books respondeu 404
+    dados = Column(JSON)
+    status_code = Column(Integer, nullable=False, default=200)
+    # Epoch em segundos, usado para calcular TTL
+    atualizado_em = Column(Float, nullable=False)
+
+
+class CapaCache(Base):
+    __tablename__ = 'capas_cache'
+
+    google_books_id = Column(String(50), primary_key=True)
+    tamanho = Column(String(20), primary_key=True)
+    # Nome do arquivo no cache em disco (conteúdo endereçado por SHA-256)
+    sha256 = Column(String(64), nullable=False, index=True)
+    content_type = Column(String(50), nullable=False)
+    bytes = Column(Integer, nullable=False)
+    ultimo_acesso = Column(Float, nullable=False, index=True)
+
+
+# URLs originais das capas vistas nas páginas de busca, para o proxy /covers não precisar
+# consultar o volume no Google Books (resultados de busca não entram em livros_cache)
+class CapaOrigem(Base):
+    __tablename__ = 'capas_origem'
+
+    google_books_id = Column(String(50), primary_key=True)
+    # {tamanho: url} como em imageLinks
+    links = Column(JSON, nullable=False)
+    atualizado_em = Column(Float, nullable=False)
+
+
+# Rankings pré-calculados por período ('geral', '30d', '7d'); mantidos pelo LeaderboardService
+class RankingLivro(Base):
+    __tablename__ = 'ranking_livros'
+    __table_args__ = (
+        Index('ix_ranking_score', 'periodo', 'score', 'total'),
+        Index('ix_ranking_total', 'periodo', 'total', 'score'),
+    )
+
+    periodo = Column(String(10), primary_key=True)
+    google_books_id = Column(String(50), primary_key=True)
+    total = Column(Integer, nullable=False)
+    soma = Column(Integer, nullable=False)
+    # Média bayesiana: (peso * media_global + soma) / (peso + total)
+    score = Column(Float, nullable=False)
+
+
+class RankingParametro(Base):
+    __tablename__ = 'ranking_parametros'
+
+    periodo = Column(String(10), primary_key=True)
+    media_global = Column(Float, nullable=False)
+    peso = Column(Float, nullable=False)
+    # Epoch em segundos da última reconstrução completa do período
+    atualizado_em = Column(Float, nullable=False)
+
+
+# Vizinhos mais similares de cada livro (cosseno sobre a matriz usuário x livro), pré-calculados
+class LivroVizinho(Base):
+    __tablename__ = 'livros_vizinhos'
+    __table_args__ = (
+        Index('ix_vizinhos_livro_score', 'google_books_id', 'score'),
+        Index('ix_vizinhos_vizinho', 'vizinho_id'),
+    )
+
+    google_books_id = Column(String(50), primary_key=True)
+    vizinho_id = Column(String(50), primary_key=True)
+    score = Column(Float, nullable=False)
+
+
+class RecomendacaoPendente(Base):
+    __tablename__ = 'recomendacoes_pendentes'
+
+    google_books_id = Column(String(50), primary_key=True)
+    # Epoch em segundos da última alteração; a atualização só descarta marcas anteriores ao seu início
+    marcado_em = Column(Float, nullable=False)
+
+
+# Próxima execução de tarefas periódicas em segundo plano; com vários workers,
+# quem consegue adiantar proxima_em (UPDATE ... WHERE proxima_em <= agora) executa
+class TarefaAgendada(Base):
+    __tablename__ = 'tarefas_agendadas'
+
+    nome = Column(String(50), primary_key=True)
+    # Epoch em segundos; durante uma execução guarda o fim da reserva
+    proxima_em = Column(Float, nullable=False)
+
+
+# Respostas do chatbot já formatadas (camada em disco de services/chat_cache.py)
+class ChatRespostaCache(Base):
+    __tablename__ = 'chat_respostas_cache'
+
+    # sha256 da mensagem normalizada + modelo + temperatura
+    chave = Column(String(64), primary_key=True)
+    resposta = Column(Text, nullable=False)
+    # Tokens consumidos na chamada original ao Groq (contabiliza a economia a cada acerto)
+    tokens = Column(Integer, nullable=False, default=0)
+    # Epoch em segundos, usado para calcular TTL
+    criado_em = Column(Float, nullable=False, index=True)
+
+
+# Sessões de login compartilhadas entre processos (backend "sqlite" de services/session_manager.py)
+class SessaoUsuario(Base):
+    __tablename__ = 'sessoes'
+
+    usuario_id = Column(String(36), primary_key=True)
+    # Epoch em segundos
+    expira_em = Column(Float, nullable=False, index=True)
+    # Epoch do último logout; tokens emitidos antes dele são recusados
+    revogado_em = Column(Float)
+
+
+def _migrate_json_favorites(session):
+    """Copia a antiga coluna JSON users.favorite_books para a tabela favoritos.
+
+    A coluna continua no banco (SQLite antigo não faz DROP COLUMN), mas é
+    zerada após a cópia para a migração não rodar de novo.
+    """
+    colunas = [row[1] for row in session.execute(text("PRAGMA table_info(users)"))]
+    if 'favorite_books' not in colunas:
+        return
+
+    for usuario_id, favoritos in session.execute(text(
+        "SELECT id, favorite_books FROM users WHERE favorite_books IS NOT NULL"
+    )).all():
+        livros = json.loads(favoritos) if isinstance(favoritos, str) else favoritos
+        if livros:
+            session.execute(
+                text("INSERT OR IGNORE INTO favoritos (usuario_id, google_books_id) VALUES (:usuario, :livro)"),
+                [{'usuario': usuario_id, 'livro': livro} for livro in dict.fromkeys(livros)]
+            )
+    session.execute(text("UPDATE users SET favorite_books = NULL WHERE favorite_books IS NOT NULL"))
+
+
+def _migrate_session_revocation(session):
+    # Tabela sessoes criada antes da revogação de tokens no logout
+    colunas = [row[1] for row in session.execute(text("PRAGMA table_info(sessoes)"))]
+    if 'revogado_em' not in colunas:
+        session.execute(text("ALTER TABLE sessoes ADD COLUMN revogado_em FLOAT"))
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all não adiciona índices novos a tabelas que já existem
+    for index in Avaliacao.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    _init_rating_triggers()
+    _init_catalog_index()
     session = SessionLocal()
     try:
         usuarios_padrao = [
@@ -70,9 +405,17 @@ def init_db():
             }
         ]
 
+        _migrate_json_favorites(session)
+        _migrate_session_revocation(session)
+
         for user_data in usuarios_padrao:
             if not session.query(User).filter_by(username=user_data['username']).first():
-                session.add(User(**user_data))
+                favoritos = user_data.pop('favorite_books')
+                session.add(User(**user_data, favoritos=[Favorito(google_books_id=bid) for bid in favoritos]))
+
+        # Bancos criados antes da tabela de agregados: preencher a partir das avaliações existentes
+        if not session.query(EstatisticaAvaliacao).first() and session.query(Avaliacao).first():
+            rebuild_rating_stats(session)
 
         session.commit()
     except Exception as e:
@@ -18,4 +18,8 @@ class PaymentRequiredException(APIException):
 
 class RateLimitException(APIException):
     def __init__(self, message):
-        super().__init__(message, 429)
\ No newline at end of file
+        super().__init__(message, 429)
+
+class ServiceUnavailableException(APIException):
+    def __init__(self, message):
+        super().__init__(message, 503)
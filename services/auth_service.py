@@ -1,10 +1,34 @@
 import os
+import time
 from itsdangerous import URLSafeTimedSerializer, BadData, SignatureExpired
 from data.db import SessionLocal, User
+from exceptions.custom_exceptions import ServiceUnavailableException
+from services.lru_cache import LRUCache
+from services.session_manager import session_store
+
+
+TOKEN_MAX_AGE = int(os.environ.get('AUTH_TOKEN_MAX_AGE', 8 * 3600))
+TOKEN_CACHE_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_TTL', 300))
+
+_token_cache = LRUCache(max_entries=int(os.environ.get('AUTH_TOKEN_CACHE_ENTRIES', 10000)), ttl=TOKEN_CACHE_TTL)
+# Perfis retornados por /auth/me; não há rota de edição de perfil, então só expiram por TTL
+_profile_cache = LRUCache(max_entries=int(os.environ.get('AUTH_PROFILE_CACHE_ENTRIES', 5000)), ttl=600)
+_serializer = None
 
 
 def _get_secret():
-    return os.environ.get('SECRET_KEY', 'dev_secret_key')
+    # Sem segredo próprio qualquer um poderia assinar um token para qualquer user_id
+    return os.environ.get('SECRET_KEY') or None
+
+
+def _get_serializer():
+    global _serializer
+    if _serializer is None:
+        secret = _get_secret()
+        if not secret:
+            raise ServiceUnavailableException("SECRET_KEY não configurada: login desabilitado.")
+        _serializer = URLSafeTimedSerializer(secret, salt='auth')
+    return _serializer
 
 
 def register_user(username: str, password: str, email: str):
@@ -26,27 +50,83 @@ def register_user(username: str, password: str, email: str):
         session.close()
 
 
-def authenticate_user(username_or_email: str, password: str, expires_sec: int = 3600):
+def authenticate_user(username_or_email: str, password: str):
+    """Confere as credenciais e devolve o perfil do usuário com um token assinado, ou None."""
     session = SessionLocal()
     try:
         user = session.query(User).filter((User.username == username_or_email) | (User.email == username_or_email)).first()
         if not user or user.password != password:
             return None
-        s = URLSafeTimedSerializer(_get_secret(), salt='auth')
-        token = s.dumps({'username': user.username})
-        return token
+        profile = {'user_id': str(user.id), 'username': user.username, 'email': user.email}
+        _profile_cache.set(profile['user_id'], profile)
+        return {**profile, 'token': issue_token(profile['user_id'], profile['username'])}
     finally:
         session.close()
 
 
-def verify_token(token: str, max_age: int = 3600):
-    s = URLSafeTimedSerializer(_get_secret(), salt='auth')
+def issue_token(user_id: str, username: str):
+    # 'iat' com fração de segundo: o timestamp do itsdangerous é inteiro e um login
+    # no mesmo segundo de um logout pareceria revogado
+    return _get_serializer().dumps({'user_id': user_id, 'username': username, 'iat': time.time()})
+
+
+def verify_token(token: str, max_age: int = TOKEN_MAX_AGE):
+    """Valida o token e devolve as claims ({'user_id', 'username'}) ou None.
+
+    Tokens já verificados ficam num LRU até expirarem (ou por TOKEN_CACHE_TTL),
+    evitando repetir o HMAC e a desserialização a cada requisição. Só num miss
+    o token é comparado com o último logout do usuário (tabela de sessões).
+    """
+    if not token or not _get_secret():
+        return None
+
+    claims = _token_cache.get(token)
+    if claims is not None:
+        return claims
+
     try:
-        data = s.loads(token, max_age=max_age)
+        data, issued_at = _get_serializer().loads(token, max_age=max_age, return_timestamp=True)
     except SignatureExpired:
         return None
     except BadData:
         return None
-    if isinstance(data, dict):
-        return data.get('username')
+    if not isinstance(data, dict) or not data.get('user_id'):
+        return None
+
+    issued = data.get('iat') or issued_at.timestamp()
+    if issued <= session_store.revoked_at(data['user_id']):
+        return None
+
+    claims = {'user_id': data['user_id'], 'username': data.get('username')}
+    remaining = int(max_age - (time.time() - issued_at.timestamp()))
+    if remaining > 0:
+        _token_cache.set(token, claims, ttl=min(TOKEN_CACHE_TTL, remaining))
+    return claims
+
+
+def token_from_header(auth_header: str):
+    if auth_header and auth_header.startswith('Bearer '):
+        return auth_header.split(' ', 1)[1].strip() or None
     return None
+
+
+def forget_token(token: str):
+    """Tira o token do cache local (logout). A revogação em si é o logout gravado na
+    tabela de sessões; outros workers que já tinham o token em cache o aceitam por
+    no máximo AUTH_TOKEN_CACHE_TTL segundos."""
+    if token:
+        _token_cache.delete(token)
+
+
+def get_profile(user_id: str):
+    def load():
+        session = SessionLocal()
+        try:
+            user = session.query(User.id, User.username, User.email).filter(User.id == user_id).first()
+            if not user:
+                return None
+            return {'user_id': str(user.id), 'username': user.username, 'email': user.email}
+        finally:
+            session.close()
+
+    return _profile_cache.get_or_load(user_id, load, should_cache=lambda profile: profile is not None)
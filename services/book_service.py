@@ -1,125 +1,601 @@
-import requests
-from exceptions.custom_exceptions import BadRequestException
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, TimeoutError as FuturesTimeoutError
+from exceptions.custom_exceptions import BadRequestException, ServiceUnavailableException
+from services.http_client import http_client
+from services.volume_cache import VolumeCache
+from services.lru_cache import LRUCache
+from services.catalog_service import CatalogService
+from services.cover_service import CoverService
+from services.circuit_breaker import CircuitBreaker
+from services.pagination import raw_timestamp, apply_keyset, split_page, clamp_limit
 from data.db import SessionLocal, Avaliacao, User
+from sqlalchemy import func
 
 
 class BookService:
     GOOGLE_BOOKS_API_URL = "https://www.googleapis.com/books/v1/volumes"
+    SEARCH_PAGE_SIZE = 10
+    SEARCH_TOTAL_PAGES = 4
+    SEARCH_PAGE_TIMEOUT = 5
+    # Páginas vazias (fim dos resultados) ficam menos tempo em cache que as demais
+    SEARCH_EMPTY_PAGE_TTL = int(os.environ.get('BOOKS_SEARCH_EMPTY_PAGE_TTL', 60))
+    SEARCH_DEADLINE = float(os.environ.get('BOOKS_SEARCH_DEADLINE', 6))
+    SEARCH_MAX_LIMIT = SEARCH_PAGE_SIZE * SEARCH_TOTAL_PAGES
+    SEARCH_SOURCES = ('upstream', 'local', 'local_first')
+    VOLUME_TIMEOUT = 5
+    BATCH_MAX_IDS = 250
+    BATCH_DEADLINE = float(os.environ.get('BOOKS_BATCH_DEADLINE', 10))
+    AVALIACOES_LIMITE = 20
+
+    # Pool compartilhado entre requisições para limitar o número de chamadas simultâneas ao Google Books
+    _search_executor = ThreadPoolExecutor(
+        max_workers=int(os.environ.get('BOOKS_SEARCH_WORKERS', 8)),
+        thread_name_prefix='books-search'
+    )
+    # Lotes (/api/books/batch) têm pool próprio para que um lote frio não atrase as buscas
+    _batch_executor = ThreadPoolExecutor(
+        max_workers=int(os.environ.get('BOOKS_BATCH_WORKERS', 4)),
+        thread_name_prefix='books-batch'
+    )
+    _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='books-refresh')
+    _refreshing = set()
+    _refresh_lock = threading.Lock()
+
+    books_breaker = CircuitBreaker.from_env('google_books', 'BOOKS_BREAKER')
+
+    search_cache = LRUCache(
+        max_entries=int(os.environ.get('BOOKS_SEARCH_CACHE_ENTRIES', 500)),
+        ttl=int(os.environ.get('BOOKS_SEARCH_CACHE_TTL', 600)),
+        max_bytes=int(os.environ.get('BOOKS_SEARCH_CACHE_BYTES', 32 * 1024 * 1024))
+    )
+
+    # Campos de volumeInfo expostos por _format_book, na ordem da resposta, com seus valores padrão
+    BOOK_FIELDS = {
+        "title": "Título não disponível",
+        "subtitle": "",
+        "authors": list,
+        "publisher": "",
+        "publishedDate": "",
+        "description": "Descrição não disponível",
+        "pageCount": 0,
+        "categories": list,
+        "averageRating": None,
+        "ratingsCount": None,
+        "language": "",
+        "previewLink": "",
+        "infoLink": "",
+        "imageLinks": None,
+        "industryIdentifiers": list
+    }
+    IMAGE_LINK_SIZES = ("smallThumbnail", "thumbnail", "small", "medium", "large", "extraLarge")
+    # Reescreve os links de capa para o proxy /covers, que guarda as imagens em disco
+    PROXY_COVERS = os.environ.get('BOOKS_PROXY_COVERS', '1') == '1'
+
+    @staticmethod
+    def _parse_fields(fields):
+        if not fields:
+            return None
+
+        if isinstance(fields, str):
+            fields = fields.split(',')
+        if not isinstance(fields, list):
+            raise BadRequestException("O campo 'fields' deve ser uma lista ou texto separado por vírgulas.")
+
+        parsed = {"id"}
+        for field in fields:
+            field = str(field).strip()
+            if not field:
+                continue
+
+            name, _, size = field.partition('.')
+            valid = field == "id" or (
+                name in BookService.BOOK_FIELDS and (not size or (name == "imageLinks" and size in BookService.IMAGE_LINK_SIZES))
+            )
+            if not valid:
+                raise BadRequestException(f"Campo inválido: {field}")
+            parsed.add(field)
+
+        return tuple(sorted(parsed))
 
     @staticmethod
-    def _format_book(item, include_avaliacoes=False, book_id=None):
+    def _image_sizes(fields):
+        if fields is None or "imageLinks" in fields:
+            return BookService.IMAGE_LINK_SIZES
+        return tuple(size for size in BookService.IMAGE_LINK_SIZES if f"imageLinks.{size}" in fields)
+
+    @staticmethod
+    def _upstream_fields(fields, search=False):
+        # Resposta parcial do Google Books: pede apenas o que _format_book vai usar
+        parts = []
+        for name in BookService.BOOK_FIELDS:
+            if name == "imageLinks":
+                sizes = BookService._image_sizes(fields)
+                if len(sizes) == len(BookService.IMAGE_LINK_SIZES):
+                    parts.append("imageLinks")
+                else:
+                    parts.extend(f"imageLinks/{size}" for size in sizes)
+            elif fields is None or name in fields:
+                parts.append(name)
+
+        volume_fields = f"id,volumeInfo({','.join(parts)})" if parts else "id"
+        return f"items({volume_fields})" if search else volume_fields
+
+    @staticmethod
+    def _format_book(item, include_avaliacoes=False, book_id=None, fields=None):
         volume_info = item.get("volumeInfo", {})
         image_links = volume_info.get("imageLinks", {})
 
-        book_data = {
-            "id": item.get("id", ""),
-            "title": volume_info.get("title", "Título não disponível"),
-            "subtitle": volume_info.get("subtitle", ""),
-            "authors": volume_info.get("authors", []),
-            "publisher": volume_info.get("publisher", ""),
-            "publishedDate": volume_info.get("publishedDate", ""),
-            "description": volume_info.get("description", "Descrição não disponível"),
-            "pageCount": volume_info.get("pageCount", 0),
-            "categories": volume_info.get("categories", []),
-            "averageRating": volume_info.get("averageRating", None),
-            "ratingsCount": volume_info.get("ratingsCount", None),
-            "language": volume_info.get("language", ""),
-            "previewLink": volume_info.get("previewLink", ""),
-            "infoLink": volume_info.get("infoLink", ""),
-            "imageLinks": {
-                "smallThumbnail": image_links.get("smallThumbnail", ""),
-                "thumbnail": image_links.get("thumbnail", ""),
-                "small": image_links.get("small", ""),
-                "medium": image_links.get("medium", ""),
-                "large": image_links.get("large", ""),
-                "extraLarge": image_links.get("extraLarge", "")
-            },
-            "industryIdentifiers": volume_info.get("industryIdentifiers", [])
-        }
+        book_data = {"id": item.get("id", "")}
+
+        for name, default in BookService.BOOK_FIELDS.items():
+            if name == "imageLinks":
+                sizes = BookService._image_sizes(fields)
+                if sizes:
+                    book_data["imageLinks"] = {size: image_links.get(size, "") for size in sizes}
+            elif fields is None or name in fields:
+                book_data[name] = volume_info.get(name, default() if callable(default) else default)
 
         return book_data
 
     @staticmethod
-    def _get_avaliacoes(google_books_id):
+    def _project_book(book_data, fields):
+        if fields is None or book_data is None:
+            return book_data
+
+        projected = {name: value for name, value in book_data.items() if name in fields}
+
+        sizes = BookService._image_sizes(fields)
+        if sizes:
+            image_links = book_data.get("imageLinks") or {}
+            projected["imageLinks"] = {size: image_links.get(size, "") for size in sizes}
+
+        return projected
+
+    @staticmethod
+    def _present_book(book_data, fields=None):
+        book_data = BookService._project_book(book_data, fields)
+        if not BookService.PROXY_COVERS or not book_data or not book_data.get("imageLinks"):
+            return book_data
+
+        # Cópia rasa: o dicionário original pode estar em cache
+        presented = dict(book_data)
+        presented["imageLinks"] = {
+            size: f"/covers/{book_data['id']}/{size}" if url else ""
+            for size, url in book_data["imageLinks"].items()
+        }
+        return presented
+
+    @staticmethod
+    def get_cover_url(book_id, size):
+        if size not in BookService.IMAGE_LINK_SIZES:
+            raise BadRequestException("Tamanho de capa inválido.")
+
+        # Livros vistos numa busca já têm a URL guardada; só os demais consultam o volume
+        url = CoverService.source_url(book_id, size)
+        if url:
+            return url
+
+        book_data = BookService._get_volume(book_id)
+        if book_data is None:
+            raise BadRequestException("Livro não encontrado.")
+
+        return (book_data.get("imageLinks") or {}).get(size) or None
+
+    @staticmethod
+    def _get_avaliacoes(google_books_id, limite=None, cursor=None):
+        limite = clamp_limit(limite, BookService.AVALIACOES_LIMITE)
         session = SessionLocal()
         try:
-            avaliacoes = session.query(Avaliacao).join(User).filter(
+            # Apenas as colunas usadas, num único SELECT com JOIN, sem montar entidades do ORM
+            query = session.query(
+                Avaliacao.id,
+                User.username,
+                Avaliacao.estrelas,
+                Avaliacao.comentario,
+                Avaliacao.data_avaliacao,
+                raw_timestamp(Avaliacao.data_avaliacao).label('data_raw')
+            ).select_from(Avaliacao).join(User, User.id == Avaliacao.usuario_id).filter(
                 Avaliacao.google_books_id == google_books_id
-            ).order_by(Avaliacao.data_avaliacao.desc()).all()
+            )
+            rows = apply_keyset(query, Avaliacao.data_avaliacao, Avaliacao.id, cursor, limite).all()
+            rows, next_cursor = split_page(rows, limite, lambda row: row.data_raw, lambda row: row.id)
 
             return [{
-                'usuario_nome': av.usuario.username,
-                'estrelas': av.estrelas,
-                'comentario': av.comentario,
-                'data_avaliacao': av.data_avaliacao.isoformat() if av.data_avaliacao else None
-            } for av in avaliacoes]
+                'usuario_nome': row.username,
+                'estrelas': row.estrelas,
+                'comentario': row.comentario,
+                'data_avaliacao': row.data_avaliacao.isoformat() if row.data_avaliacao else None
+            } for row in rows], next_cursor
+        except BadRequestException:
+            raise
+        except Exception as e:
+            print(f"Erro ao buscar avaliações: {e}")
+            return [], None
+        finally:
+            session.close()
+
+    @staticmethod
+    def _get_avaliacoes_many(google_books_ids, limite=None):
+        """As `limite` avaliações mais recentes de cada livro, num único SELECT."""
+        limite = clamp_limit(limite, BookService.AVALIACOES_LIMITE)
+        resultado = {book_id: [] for book_id in google_books_ids}
+        if not google_books_ids:
+            return resultado
+
+        session = SessionLocal()
+        try:
+            posicao = func.row_number().over(
+                partition_by=Avaliacao.google_books_id,
+                order_by=(Avaliacao.data_avaliacao.desc(), Avaliacao.id.desc())
+            ).label('posicao')
+            recentes = session.query(
+                Avaliacao.google_books_id,
+                User.username,
+                Avaliacao.estrelas,
+                Avaliacao.comentario,
+                Avaliacao.data_avaliacao,
+                posicao
+            ).select_from(Avaliacao).join(User, User.id == Avaliacao.usuario_id).filter(
+                Avaliacao.google_books_id.in_(google_books_ids)
+            ).subquery()
+            rows = session.query(recentes).filter(recentes.c.posicao <= limite).order_by(
+                recentes.c.google_books_id, recentes.c.posicao
+            ).all()
+
+            for row in rows:
+                resultado[row.google_books_id].append({
+                    'usuario_nome': row.username,
+                    'estrelas': row.estrelas,
+                    'comentario': row.comentario,
+                    'data_avaliacao': row.data_avaliacao.isoformat() if row.data_avaliacao else None
+                })
+            return resultado
         except Exception as e:
             print(f"Erro ao buscar avaliações: {e}")
-            return []
+            return resultado
         finally:
             session.close()
 
     @staticmethod
-    def search_books(query):
+    def _normalize_query(query):
+        return ' '.join(query.lower().split())
+
+    @staticmethod
+    def _search_window(start_index, limit):
+        try:
+            start_index = int(start_index or 0)
+            limit = BookService.SEARCH_MAX_LIMIT if limit is None else int(limit)
+        except (TypeError, ValueError):
+            raise BadRequestException("'startIndex' e 'limit' devem ser números inteiros.")
+
+        if start_index < 0:
+            raise BadRequestException("'startIndex' não pode ser negativo.")
+        if not 1 <= limit <= BookService.SEARCH_MAX_LIMIT:
+            raise BadRequestException(f"'limit' deve estar entre 1 e {BookService.SEARCH_MAX_LIMIT}.")
+
+        first_page = start_index // BookService.SEARCH_PAGE_SIZE
+        last_page = (start_index + limit - 1) // BookService.SEARCH_PAGE_SIZE
+        return start_index, limit, list(range(first_page, last_page + 1))
+
+    @staticmethod
+    def _search_page(query, page, timeout, deadline, fields=None):
+        # Cada página é guardada separadamente para que buscas paginadas reaproveitem o cache;
+        # buscas idênticas simultâneas compartilham uma única ida ao Google Books.
+        # Falhas do upstream (None) não são guardadas; páginas vazias ficam com TTL curto
+        return BookService.search_cache.get_or_load(
+            (BookService._normalize_query(query), page, fields),
+            lambda: BookService._fetch_search_page(
+                query, page * BookService.SEARCH_PAGE_SIZE, timeout, deadline, fields
+            ),
+            should_cache=lambda items: items is not None,
+            ttl=lambda items: None if items else BookService.SEARCH_EMPTY_PAGE_TTL
+        )
+
+    @staticmethod
+    def _submit_search_pages(query, pages, fields=None):
+        deadline = time.monotonic() + BookService.SEARCH_DEADLINE
+        page_timeout = min(BookService.SEARCH_PAGE_TIMEOUT, BookService.SEARCH_DEADLINE)
+
+        futures = {
+            BookService._search_executor.submit(
+                BookService._search_page, query, page, page_timeout, deadline, fields
+            ): page
+            for page in pages
+        }
+        return futures, deadline
+
+    @staticmethod
+    def _page_books(page, items, start_index, limit):
+        for position, item in enumerate(items):
+            index = page * BookService.SEARCH_PAGE_SIZE + position
+            if start_index <= index < start_index + limit:
+                yield index, item
+
+    @staticmethod
+    def search_books(query, start_index=0, limit=None, fields=None):
         if not query or not query.strip():
             raise BadRequestException("Livro não encontrado.")
 
-        all_books = []
-        max_results_per_page = 10
-        total_pages = 4
+        fields = BookService._parse_fields(fields)
+        start_index, limit, pages = BookService._search_window(start_index, limit)
+        futures, deadline = BookService._submit_search_pages(query, pages, fields)
 
-        for page in range(total_pages):
-            start_index = page * max_results_per_page
-            params = {
-                "q": query,
-                "maxResults": max_results_per_page,
-                "startIndex": start_index
-            }
+        wait(futures, timeout=max(0, deadline - time.monotonic()))
+
+        items_by_page = {}
+        for future, page in futures.items():
+            # Página que falhou ou estourou o prazo descarta apenas a própria fatia
+            if not future.done():
+                future.cancel()
+                continue
 
             try:
-                response = requests.get(
-                    BookService.GOOGLE_BOOKS_API_URL,
-                    params=params,
-                    timeout=5
-                )
+                items_by_page[page] = future.result()
+            except Exception:
+                continue
+
+        books = []
+        for page in pages:
+            items = items_by_page.get(page)
+            if items is None:
+                continue
 
-                if response.status_code != 200:
-                    continue
+            # Página vazia indica fim dos resultados; as seguintes também estarão vazias
+            if not items:
+                break
 
-                data = response.json()
-                items = data.get("items", [])
+            books.extend(item for _, item in BookService._page_books(page, items, start_index, limit))
 
-                if not items:
-                    break
+        # Com o Google Books fora do ar, as páginas em cache já foram usadas; o resto vem do catálogo local
+        if not books and BookService.books_breaker.state != CircuitBreaker.CLOSED:
+            return [BookService._present_book(book, fields) for book in CatalogService.search(query, start_index, limit)]
 
-                all_books.extend(items)
+        return [BookService._present_book(book) for book in books]
 
-            except requests.exceptions.Timeout:
-                continue
+    @staticmethod
+    def iter_search_books(query, start_index=0, limit=None, fields=None):
+        """Versão em streaming de search_books: entrega cada livro assim que sua página chega,
+        com o índice absoluto para que o cliente o posicione."""
+        if not query or not query.strip():
+            raise BadRequestException("Livro não encontrado.")
+
+        fields = BookService._parse_fields(fields)
+        start_index, limit, pages = BookService._search_window(start_index, limit)
+        futures, deadline = BookService._submit_search_pages(query, pages, fields)
+
+        def generate():
+            try:
+                for future in as_completed(futures, timeout=max(0, deadline - time.monotonic())):
+                    try:
+                        items = future.result()
+                    except Exception:
+                        continue
+
+                    for index, book in BookService._page_books(futures[future], items or [], start_index, limit):
+                        yield {"index": index, "book": BookService._present_book(book)}
+            except FuturesTimeoutError:
+                pass
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return generate()
+
+    @staticmethod
+    def search_books_local(query, start_index=0, limit=None, fields=None):
+        if not query or not query.strip():
+            raise BadRequestException("Livro não encontrado.")
+
+        fields = BookService._parse_fields(fields)
+        start_index, limit, _ = BookService._search_window(start_index, limit)
+
+        books = CatalogService.search(query, start_index, limit)
+        return [BookService._present_book(book, fields) for book in books]
+
+    @staticmethod
+    def search_books_local_first(query, start_index=0, limit=None, fields=None):
+        if not query or not query.strip():
+            raise BadRequestException("Livro não encontrado.")
+
+        fields = BookService._parse_fields(fields)
+        start_index, limit, _ = BookService._search_window(start_index, limit)
+
+        local_books = CatalogService.search(query, 0, start_index + limit)
+        merged = [BookService._present_book(book, fields) for book in local_books]
+
+        # O catálogo local já cobre a janela pedida: nenhuma ida ao Google Books
+        if len(merged) < start_index + limit:
+            try:
+                upstream_books = BookService.search_books(query, 0, BookService.SEARCH_MAX_LIMIT, fields)
             except Exception:
-                continue
+                upstream_books = []
+
+            seen = {book["id"] for book in merged}
+            merged.extend(book for book in upstream_books if book["id"] not in seen)
 
-        return [BookService._format_book(item) for item in all_books]
+        return merged[start_index:start_index + limit]
 
     @staticmethod
-    def search_books_by_id(book_id):
-        if not book_id or not book_id.strip():
-            raise BadRequestException("O ID do livro é obrigatório.")
+    def _upstream_get(url, **kwargs):
+        # 429 e 5xx contam como falha para o disjuntor, assim como exceções e respostas lentas
+        return BookService.books_breaker.call(
+            http_client.get, url,
+            is_failure=lambda response: response.status_code == 429 or response.status_code >= 500,
+            **kwargs
+        )
 
-        response = requests.get(f"{BookService.GOOGLE_BOOKS_API_URL}/{book_id}")
+    @staticmethod
+    def _fetch_search_page(query, start_index, timeout, deadline=None, fields=None):
+        params = {
+            "q": query,
+            "maxResults": BookService.SEARCH_PAGE_SIZE,
+            "startIndex": start_index,
+            "fields": BookService._upstream_fields(fields, search=True)
+        }
+
+        response = BookService._upstream_get(
+            BookService.GOOGLE_BOOKS_API_URL,
+            params=params,
+            timeout=timeout,
+            deadline=deadline
+        )
+
+        if response.status_code != 200:
+            return None
+
+        books = [BookService._format_book(item, fields=fields) for item in response.json().get("items", [])]
+        if BookService.PROXY_COVERS:
+            CoverService.remember_sources(books)
+        return books
+
+    @staticmethod
+    def _fetch_volume(book_id, deadline=None):
+        # O cache local guarda o livro completo; a projeção por 'fields' é feita na resposta.
+        # O prazo vale para todas as tentativas juntas, não para cada uma
+        response = BookService._upstream_get(
+            f"{BookService.GOOGLE_BOOKS_API_URL}/{book_id}",
+            params={"fields": BookService._upstream_fields(None)},
+            timeout=BookService.VOLUME_TIMEOUT,
+            deadline=deadline or time.monotonic() + BookService.VOLUME_TIMEOUT
+        )
 
         if response.status_code == 404:
-            raise BadRequestException("Livro não encontrado.")
+            VolumeCache.put(book_id, None, 404)
+            return 404, None
         if response.status_code != 200:
-            raise BadRequestException("Livro não encontrado.")
+            return response.status_code, None
 
         book_data = BookService._format_book(response.json())
+        VolumeCache.put(book_id, book_data)
+        return 200, book_data
 
-        avaliacoes = BookService._get_avaliacoes(book_id)
+    @staticmethod
+    def _refresh_volume(book_id):
+        try:
+            BookService._fetch_volume(book_id)
+        except Exception as e:
+            print(f"Erro ao atualizar livro {book_id} em segundo plano: {e}")
+        finally:
+            with BookService._refresh_lock:
+                BookService._refreshing.discard(book_id)
+
+    @staticmethod
+    def _schedule_refresh(book_id):
+        with BookService._refresh_lock:
+            if book_id in BookService._refreshing:
+                return
+            BookService._refreshing.add(book_id)
+        BookService._refresh_executor.submit(BookService._refresh_volume, book_id)
+
+    @staticmethod
+    def _get_volume(book_id):
+        return BookService._resolve_volume(book_id, VolumeCache.get(book_id))
+
+    @staticmethod
+    def _resolve_volume(book_id, cached, deadline=None):
+        if cached:
+            if cached['fresh']:
+                return cached['book']
+            if cached['usable']:
+                BookService._schedule_refresh(book_id)
+                return cached['book']
+
+        unavailable = None
+        try:
+            status_code, book_data = BookService._fetch_volume(book_id, deadline)
+        except ServiceUnavailableException as e:
+            status_code, book_data, unavailable = None, None, e
+        except Exception:
+            status_code, book_data = None, None
+
+        if status_code in (200, 404):
+            return book_data
+
+        # Upstream indisponível: qualquer cópia local, mesmo muito antiga, é melhor que erro
+        if cached and cached['book']:
+            return cached['book']
+
+        if unavailable:
+            raise unavailable
+        raise BadRequestException("Livro não encontrado.")
+
+    @staticmethod
+    def search_books_by_id(book_id, fields=None, avaliacoes_limite=None, avaliacoes_cursor=None):
+        if not book_id or not book_id.strip():
+            raise BadRequestException("O ID do livro é obrigatório.")
+
+        fields = BookService._parse_fields(fields)
+        book_data = BookService._get_volume(book_id)
+
+        if book_data is None:
+            raise BadRequestException("Livro não encontrado.")
+
+        avaliacoes, avaliacoes_next_cursor = BookService._get_avaliacoes(book_id, avaliacoes_limite, avaliacoes_cursor)
 
         from collections import OrderedDict
         result = OrderedDict()
-        result['book'] = book_data
+        result['book'] = BookService._present_book(book_data, fields)
         result['avaliacoes'] = avaliacoes
+        result['avaliacoes_next_cursor'] = avaliacoes_next_cursor
+
+        return result
+
+    @staticmethod
+    def search_books_by_ids(book_ids, include_avaliacoes=False, fields=None, avaliacoes_limite=None):
+        if not isinstance(book_ids, list) or not book_ids:
+            raise BadRequestException("O campo 'ids' deve ser uma lista de IDs de livros.")
+
+        unique_ids = list(dict.fromkeys(
+            str(book_id).strip() for book_id in book_ids if book_id and str(book_id).strip()
+        ))
+        if not unique_ids:
+            raise BadRequestException("O campo 'ids' deve ser uma lista de IDs de livros.")
+        if len(unique_ids) > BookService.BATCH_MAX_IDS:
+            raise BadRequestException(f"Máximo de {BookService.BATCH_MAX_IDS} livros por requisição.")
+
+        fields = BookService._parse_fields(fields)
+        avaliacoes_limite = clamp_limit(avaliacoes_limite, BookService.AVALIACOES_LIMITE)
+
+        cached_map = VolumeCache.get_many(unique_ids)
+        volumes = {}
+        futures = {}
+        # Livros que não chegam até o prazo entram em not_found e a resposta sai como degradada
+        deadline = time.monotonic() + BookService.BATCH_DEADLINE
 
-        return result
\ No newline at end of file
+        for book_id in unique_ids:
+            cached = cached_map.get(book_id)
+            if cached and (cached['fresh'] or cached['usable']):
+                volumes[book_id] = BookService._resolve_volume(book_id, cached)
+            else:
+                futures[book_id] = BookService._batch_executor.submit(
+                    BookService._resolve_volume, book_id, cached, deadline
+                )
+
+        timed_out = False
+        for book_id, future in futures.items():
+            try:
+                volumes[book_id] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FuturesTimeoutError:
+                future.cancel()
+                volumes[book_id] = None
+                timed_out = True
+            except Exception:
+                volumes[book_id] = None
+
+        found_ids = [book_id for book_id in unique_ids if volumes.get(book_id)]
+        avaliacoes = BookService._get_avaliacoes_many(found_ids, avaliacoes_limite) if include_avaliacoes else {}
+
+        books = []
+        for book_id in found_ids:
+            item = {'id': book_id, 'book': BookService._present_book(volumes[book_id], fields)}
+            if include_avaliacoes:
+                item['avaliacoes'] = avaliacoes.get(book_id, [])
+            books.append(item)
+
+        return {
+            'books': books,
+            'not_found': [book_id for book_id in unique_ids if not volumes.get(book_id)],
+            'degraded': timed_out or BookService.books_breaker.state != CircuitBreaker.CLOSED
+        }
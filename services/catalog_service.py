@@ -0,0 +1,94 @@
+import re
+from sqlalchemy import text, table, column
+from data.db import SessionLocal, LivroCache, CATALOG_FTS_TABLE, catalog_rowid
+
+catalog_fts = table(CATALOG_FTS_TABLE, column('google_books_id'))
+
+
+class CatalogService:
+    # Pesos do bm25 na ordem das colunas do índice (google_books_id não é indexado)
+    RANK_WEIGHTS = (0, 10.0, 4.0, 6.0, 2.0, 1.0)
+
+    @staticmethod
+    def _join(value):
+        if isinstance(value, list):
+            return ', '.join(str(v) for v in value)
+        return value or ''
+
+    @staticmethod
+    def index_book(session, google_books_id, book):
+        """Atualiza o livro no índice usando a sessão (e a transação) de quem chamou."""
+        rowid = catalog_rowid(google_books_id)
+        session.execute(text(f"DELETE FROM {CATALOG_FTS_TABLE} WHERE rowid = :rowid"), {"rowid": rowid})
+        if not book:
+            return
+
+        session.execute(
+            text(
+                f"INSERT INTO {CATALOG_FTS_TABLE} "
+                "(rowid, google_books_id, title, subtitle, authors, categories, description) "
+                "VALUES (:rowid, :id, :title, :subtitle, :authors, :categories, :description)"
+            ),
+            {
+                "rowid": rowid,
+                "id": google_books_id,
+                "title": book.get("title", ""),
+                "subtitle": book.get("subtitle", ""),
+                "authors": CatalogService._join(book.get("authors")),
+                "categories": CatalogService._join(book.get("categories")),
+                "description": book.get("description", "")
+            }
+        )
+
+    @staticmethod
+    def _match_expression(query):
+        tokens = re.findall(r'\w+', query or '')
+        if not tokens:
+            return None
+        # Cada termo vira uma frase entre aspas para não ser lido como sintaxe do FTS5;
+        # o último aceita prefixo para funcionar enquanto o usuário digita
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        return ' '.join(terms)
+
+    @staticmethod
+    def search(query, start_index=0, limit=40):
+        match = CatalogService._match_expression(query)
+        if not match:
+            return []
+
+        weights = ', '.join(str(w) for w in CatalogService.RANK_WEIGHTS)
+        session = SessionLocal()
+        try:
+            rows = session.query(LivroCache.dados).select_from(catalog_fts).join(
+                LivroCache, LivroCache.google_books_id == catalog_fts.c.google_books_id
+            ).filter(
+                text(f"{CATALOG_FTS_TABLE} MATCH :match"),
+                LivroCache.status_code == 200
+            ).order_by(
+                text(f"bm25({CATALOG_FTS_TABLE}, {weights})")
+            ).limit(limit).offset(start_index).params(match=match).all()
+
+            return [row.dados for row in rows]
+        except Exception as e:
+            print(f"Erro na busca do catálogo local: {e}")
+            return []
+        finally:
+            session.close()
+
+    @staticmethod
+    def rebuild():
+        session = SessionLocal()
+        try:
+            session.execute(text(f"DELETE FROM {CATALOG_FTS_TABLE}"))
+            total = 0
+            for entry in session.query(LivroCache).filter(LivroCache.status_code == 200).all():
+                CatalogService.index_book(session, entry.google_books_id, entry.dados)
+                total += 1
+            session.commit()
+            return total
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
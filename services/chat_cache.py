@@ -0,0 +1,191 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import unicodedata
+from data.db import SessionLocal, ChatRespostaCache
+from services.lru_cache import LRUCache
+
+
+class _PendingStream:
+    def __init__(self):
+        self.event = threading.Event()
+        self.entry = None
+        self.started = time.monotonic()
+
+
+class ChatCache:
+    """Cache de respostas do chatbot: LRU em memória na frente de uma tabela SQLite
+    (opcional, CHAT_CACHE_DISK=0 desliga) que sobrevive a reinícios.
+
+    Entradas são dicts {'answer', 'tokens'}; `tokens` é o uso informado pelo Groq
+    na chamada original e entra em `tokens_saved` a cada acerto.
+    """
+
+    TTL = int(os.environ.get('CHAT_CACHE_TTL', 24 * 3600))
+    DISK_ENABLED = os.environ.get('CHAT_CACHE_DISK', '1') != '0'
+    # Quanto um pedido em streaming espera por outro idêntico já em andamento
+    STREAM_WAIT = int(os.environ.get('CHAT_STREAM_WAIT', 60))
+
+    memory = LRUCache(
+        max_entries=int(os.environ.get('CHAT_CACHE_ENTRIES', 1000)),
+        ttl=TTL,
+        max_bytes=int(os.environ.get('CHAT_CACHE_BYTES', 8 * 1024 * 1024))
+    )
+    _lock = threading.Lock()
+    _streams = {}
+    _stats = {'requests': 0, 'memory_hits': 0, 'disk_hits': 0, 'upstream_calls': 0, 'tokens_saved': 0}
+
+    @staticmethod
+    def normalize(message):
+        # Mesma pergunta com caixa, espaços ou pontuação final diferentes cai na mesma chave
+        text = unicodedata.normalize('NFKC', str(message)).casefold()
+        text = re.sub(r'\s+', ' ', text).strip()
+        return text.rstrip(' ?!.')
+
+    @staticmethod
+    def make_key(message, model, temperature):
+        raw = json.dumps([ChatCache.normalize(message), model, temperature], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _count(**increments):
+        with ChatCache._lock:
+            for name, value in increments.items():
+                ChatCache._stats[name] += value
+
+    @staticmethod
+    def _disk_get(key):
+        if not ChatCache.DISK_ENABLED:
+            return None
+        session = SessionLocal()
+        try:
+            entry = session.get(ChatRespostaCache, key)
+            if not entry or time.time() - entry.criado_em > ChatCache.TTL:
+                return None
+            return {'answer': entry.resposta, 'tokens': entry.tokens}
+        except Exception as e:
+            print(f"Erro ao ler cache do chat: {e}")
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    def _disk_put(key, entry):
+        if not ChatCache.DISK_ENABLED:
+            return
+        session = SessionLocal()
+        try:
+            now = time.time()
+            session.merge(ChatRespostaCache(
+                chave=key, resposta=entry['answer'], tokens=entry['tokens'], criado_em=now
+            ))
+            session.query(ChatRespostaCache).filter(
+                ChatRespostaCache.criado_em < now - ChatCache.TTL
+            ).delete(synchronize_session=False)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Erro ao gravar cache do chat: {e}")
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_or_complete(key, complete):
+        """Devolve a resposta em cache ou chama `complete()` uma única vez por chave,
+        mesmo com pedidos idênticos simultâneos (os demais esperam e reutilizam)."""
+        origin = []
+
+        def load():
+            entry = ChatCache._disk_get(key)
+            if entry is not None:
+                origin.append('disk')
+                return entry
+            origin.append('upstream')
+            entry = complete()
+            ChatCache._disk_put(key, entry)
+            return entry
+
+        entry = ChatCache.memory.get_or_load(key, load)
+
+        if not origin:
+            # Acerto na memória ou pedido que pegou carona numa chamada em andamento
+            ChatCache._count(requests=1, memory_hits=1, tokens_saved=entry['tokens'])
+        elif origin[0] == 'disk':
+            ChatCache._count(requests=1, disk_hits=1, tokens_saved=entry['tokens'])
+        else:
+            ChatCache._count(requests=1, upstream_calls=1)
+        return entry
+
+    @staticmethod
+    def _lookup(key):
+        """Só consulta (memória e disco), sem chamar o Groq."""
+        entry = ChatCache.memory.get(key)
+        if entry is not None:
+            ChatCache._count(requests=1, memory_hits=1, tokens_saved=entry['tokens'])
+            return entry
+
+        entry = ChatCache._disk_get(key)
+        if entry is not None:
+            ChatCache.memory.set(key, entry)
+            ChatCache._count(requests=1, disk_hits=1, tokens_saved=entry['tokens'])
+        return entry
+
+    @staticmethod
+    def begin_stream(key):
+        """Ponto de entrada do modo streaming: devolve `(entry, pending)`.
+
+        Com a resposta em cache, `entry` vem preenchido. Se outro pedido idêntico
+        já está recebendo a resposta do Groq, espera por ela (até STREAM_WAIT) e a
+        reutiliza. Senão `pending` vem preenchido: quem recebeu deve chamar o Groq
+        e depois `finish_stream` mesmo em caso de erro, para liberar quem espera.
+        """
+        while True:
+            entry = ChatCache._lookup(key)
+            if entry is not None:
+                return entry, None
+
+            with ChatCache._lock:
+                pending = ChatCache._streams.get(key)
+                # Stream que nunca chegou a ser consumido não segura a chave para sempre
+                if pending is None or time.monotonic() - pending.started > ChatCache.STREAM_WAIT:
+                    pending = _PendingStream()
+                    ChatCache._streams[key] = pending
+                    ChatCache._stats['requests'] += 1
+                    ChatCache._stats['upstream_calls'] += 1
+                    return None, pending
+
+            if not pending.event.wait(ChatCache.STREAM_WAIT):
+                # O primeiro demorou demais: segue com uma chamada própria, sem coordenar
+                ChatCache._count(requests=1, upstream_calls=1)
+                return None, _PendingStream()
+            if pending.entry is not None:
+                # Pedido que pegou carona num stream em andamento
+                ChatCache._count(requests=1, memory_hits=1, tokens_saved=pending.entry['tokens'])
+                return pending.entry, None
+            # O stream do outro pedido falhou: tenta de novo (vira o responsável ou espera outro)
+
+    @staticmethod
+    def finish_stream(key, pending, entry):
+        """Grava a resposta completa (None se o stream falhou ou foi interrompido)
+        e acorda os pedidos que esperavam por ela."""
+        if entry is not None:
+            ChatCache.memory.set(key, entry)
+            ChatCache._disk_put(key, entry)
+        pending.entry = entry
+        with ChatCache._lock:
+            if ChatCache._streams.get(key) is pending:
+                del ChatCache._streams[key]
+        pending.event.set()
+
+    @staticmethod
+    def stats():
+        with ChatCache._lock:
+            stats = dict(ChatCache._stats)
+        hits = stats['memory_hits'] + stats['disk_hits']
+        stats['hit_ratio'] = round(hits / stats['requests'], 4) if stats['requests'] else 0
+        stats['disk_enabled'] = ChatCache.DISK_ENABLED
+        stats['memory'] = ChatCache.memory.stats()
+        return stats
@@ -1,6 +1,8 @@
 import os
 import re
-import requests
+import json
+from services.http_client import http_client
+from services.chat_cache import ChatCache
 from exceptions.custom_exceptions import (
     BadRequestException,
     UnauthorizedException,
@@ -8,19 +10,141 @@ from exceptions.custom_exceptions import (
 )
 
 
+class StreamFormatter:
+    """Aplica a mesma formatação de ChatService.format_response em pedaços de texto
+    que chegam aos poucos (streaming).
+
+    Repete as etapas de format_response em sequência, cada uma retendo só o que
+    ainda pode mudar com o texto que falta:
+    1. ** e * não atravessam linhas: a linha fica retida a partir do primeiro '*'
+       até acabar;
+    2. a crase atravessa linhas: o texto fica retido a partir de uma crase sem par
+       até o par chegar ou a resposta acabar;
+    3. quebras de linha seguidas e espaços nas pontas ficam retidos até o próximo
+       caractere, para reproduzir o limite de duas quebras e o strip() do final.
+    """
+
+    def __init__(self):
+        self.linha = ''
+        self.crase = ''
+        self.quebras = 0
+        self.espacos = ''
+        self.iniciou = False
+
+    def _linhas(self, texto, final):
+        self.linha += texto
+        *completas, self.linha = self.linha.split('\n')
+        saida = ''.join(ChatService._format_emphasis(linha) + '\n' for linha in completas)
+
+        if final:
+            saida += ChatService._format_emphasis(self.linha)
+            self.linha = ''
+            return saida
+
+        # O que vem antes do primeiro '*' da linha não muda mais
+        inicio = self.linha.find('*')
+        if inicio < 0:
+            inicio = len(self.linha)
+        saida += self.linha[:inicio]
+        self.linha = self.linha[inicio:]
+        return saida
+
+    def _crases(self, texto, final):
+        self.crase += texto
+        saida = ''
+        while True:
+            inicio = self.crase.find('`')
+            if inicio < 0:
+                saida += self.crase
+                self.crase = ''
+                break
+            saida += self.crase[:inicio]
+            self.crase = self.crase[inicio:]
+            if len(self.crase) < 2:
+                break
+            if self.crase[1] == '`':
+                # Crase seguida de crase não abre trecho; a próxima ainda pode abrir
+                saida += '`'
+                self.crase = self.crase[1:]
+                continue
+            fim = self.crase.find('`', 1)
+            if fim < 0:
+                break
+            saida += self.crase[1:fim]
+            self.crase = self.crase[fim + 1:]
+
+        if final:
+            saida += self.crase
+            self.crase = ''
+        return saida
+
+    def _quebras(self, texto, final):
+        saida = ''
+        for c in texto:
+            if c == '\n':
+                # A quebra vira <br>, que o strip() não remove
+                saida += self.espacos
+                self.espacos = ''
+                self.quebras += 1
+                self.iniciou = True
+                continue
+            if self.quebras:
+                # Três ou mais quebras seguidas viram duas
+                saida += '<br>' * min(self.quebras, 2)
+                self.quebras = 0
+            if c.isspace():
+                if self.iniciou:
+                    self.espacos += c
+                continue
+            saida += self.espacos + c
+            self.espacos = ''
+            self.iniciou = True
+
+        if final:
+            saida += '<br>' * min(self.quebras, 2)
+            self.quebras = 0
+            self.espacos = ''
+        return saida
+
+    def _processar(self, texto, final):
+        texto = self._linhas(texto, final)
+        texto = self._crases(texto, final)
+        return self._quebras(texto, final)
+
+    def feed(self, chunk):
+        return self._processar(chunk, final=False)
+
+    def flush(self):
+        return self._processar('', final=True)
+
+
 class ChatService:
     GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+    DEFAULT_MODEL = "llama-3.1-8b-instant"
+    TEMPERATURE = 0.7
+
+    @staticmethod
+    def _format_emphasis(text: str) -> str:
+        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+
+        text = re.sub(r'\*(.*?)\*', r'\1', text)
+
+        return text
+
+    @staticmethod
+    def _format_code(text: str) -> str:
+        return re.sub(r'`([^`]+)`', r'\1', text)
+
+    @staticmethod
+    def _format_inline(text: str) -> str:
+        return ChatService._format_code(ChatService._format_emphasis(text))
 
     @staticmethod
     def format_response(raw_text: str) -> str:
         if not raw_text:
             return ''
 
-        text = re.sub(r'\*\*(.*?)\*\*', r'\1', raw_text)
-
-        text = re.sub(r'\*(.*?)\*', r'\1', text)
-
-        text = re.sub(r'`([^`]+)`', r'\1', text)
+        text = ChatService._format_inline(raw_text)
 
         text = re.sub(r'\n{3,}', '\n\n', text)
 
@@ -31,26 +155,33 @@ class ChatService:
         return text
 
     @staticmethod
-    def ask(message, api_key=None, model=None, hf_token=None, hf_model=None, **kwargs):
-        if not message or not str(message).strip():
-            return {"answer": "Digite uma mensagem para continuar."}
-
+    def _post_completion(message, api_key=None, model=None, temperature=None, stream=False):
         groq_key = api_key or os.environ.get('GROQ_API_KEY')
         if not groq_key:
             raise BadRequestException("GROQ_API_KEY não configurada")
 
-        response = requests.post(
+        payload = {
+            "model": model or ChatService.DEFAULT_MODEL,
+            "messages": [{"role": "user", "content": message}],
+            "temperature": ChatService.TEMPERATURE if temperature is None else temperature,
+            "max_tokens": 1000
+        }
+        if stream:
+            payload["stream"] = True
+
+        # Sem retentativa: a completion não é idempotente e conta no rate limit do Groq,
+        # e um timeout de leitura repetido dobraria a espera do usuário
+        response = http_client.post(
             ChatService.GROQ_API_URL,
-            json={
-                "model": model or "llama-3.1-8b-instant",
-                "messages": [{"role": "user", "content": message}],
-                "temperature": 0.7,
-                "max_tokens": 1000
-            },
+            json=payload,
             headers={"Authorization": f"Bearer {groq_key}", "Content-Type": "application/json"},
-            timeout=30
+            timeout=30,
+            retries=0,
+            stream=stream
         )
 
+        if response.status_code != 200:
+            response.close()
         if response.status_code == 401:
             raise UnauthorizedException("Groq API key inválida")
         if response.status_code == 429:
@@ -58,8 +189,99 @@ class ChatService:
         if response.status_code != 200:
             raise Exception(f"Groq error: {response.status_code}")
 
-        content = response.json()['choices'][0]['message']['content']
+        return response
+
+    @staticmethod
+    def _usage_tokens(data):
+        # Groq manda o uso em "usage" na resposta completa e em "x_groq.usage" no último chunk do stream
+        usage = data.get('usage') or (data.get('x_groq') or {}).get('usage') or {}
+        return usage.get('total_tokens') or 0
+
+    @staticmethod
+    def _complete(message, api_key=None, model=None, temperature=None):
+        data = ChatService._post_completion(message, api_key=api_key, model=model, temperature=temperature).json()
+        content = data['choices'][0]['message']['content']
+        return {"answer": ChatService.format_response(content), "tokens": ChatService._usage_tokens(data)}
+
+    @staticmethod
+    def _cache_key(message, model, temperature):
+        return ChatCache.make_key(
+            message,
+            model or ChatService.DEFAULT_MODEL,
+            ChatService.TEMPERATURE if temperature is None else temperature
+        )
+
+    @staticmethod
+    def ask(message, api_key=None, model=None, hf_token=None, hf_model=None, temperature=None, **kwargs):
+        if not message or not str(message).strip():
+            return {"answer": "Digite uma mensagem para continuar."}
+
+        entry = ChatCache.get_or_complete(
+            ChatService._cache_key(message, model, temperature),
+            lambda: ChatService._complete(message, api_key=api_key, model=model, temperature=temperature)
+        )
+
+        return {"answer": entry['answer']}
+
+    @staticmethod
+    def stream(message, api_key=None, model=None, temperature=None):
+        """Abre a completion em modo streaming e devolve um gerador de trechos já formatados.
+
+        A requisição e a checagem de status acontecem antes de retornar, para que
+        erros (chave inválida, rate limit) ainda virem uma resposta JSON normal.
+        Respostas em cache saem num único trecho, assim como as de um pedido
+        idêntico que estava em andamento (que é esperado em vez de chamar o Groq
+        de novo); uma resposta recebida até o fim é gravada no cache.
+        """
+        if not message or not str(message).strip():
+            return iter(["Digite uma mensagem para continuar."])
+
+        key = ChatService._cache_key(message, model, temperature)
+        cached, pending = ChatCache.begin_stream(key)
+        if cached is not None:
+            return iter([cached['answer']])
+
+        try:
+            response = ChatService._post_completion(
+                message, api_key=api_key, model=model, temperature=temperature, stream=True
+            )
+        except Exception:
+            ChatCache.finish_stream(key, pending, None)
+            raise
+        response.encoding = 'utf-8'
 
-        formatted_text = ChatService.format_response(content)
+        def gerar():
+            formatter = StreamFormatter()
+            partes = []
+            tokens = 0
+            concluido = False
+            entry = None
+            try:
+                for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        concluido = True
+                        break
+                    chunk = json.loads(data)
+                    tokens = ChatService._usage_tokens(chunk) or tokens
+                    choices = chunk.get('choices') or [{}]
+                    delta = (choices[0].get('delta') or {}).get('content')
+                    if delta:
+                        trecho = formatter.feed(delta)
+                        if trecho:
+                            partes.append(trecho)
+                            yield trecho
+                resto = formatter.flush()
+                if resto:
+                    partes.append(resto)
+                    yield resto
+                # Stream interrompido não vai para o cache
+                if concluido:
+                    entry = {"answer": ''.join(partes), "tokens": tokens}
+            finally:
+                response.close()
+                ChatCache.finish_stream(key, pending, entry)
 
-        return {"answer": formatted_text}
\ No newline at end of file
+        return gerar()
@@ -0,0 +1,175 @@
+import os
+import time
+import threading
+from collections import deque
+from exceptions.custom_exceptions import ServiceUnavailableException
+
+
+class CircuitBreaker:
+    """Disjuntor para dependências externas.
+
+    Abre quando a taxa de falhas ou de chamadas lentas na janela recente passa do limite,
+    rejeita chamadas enquanto aberto e, após `open_seconds`, libera algumas chamadas de
+    teste (meio-aberto) antes de voltar a fechar.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_rate=0.5, slow_call_rate=0.8, slow_call_seconds=2.5,
+                 window_size=20, window_seconds=60, min_calls=10, open_seconds=30, half_open_calls=3):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._calls = deque(maxlen=window_size)
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+        self.total_calls = 0
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            self._check_open_timeout()
+            return self._state
+
+    def _check_open_timeout(self):
+        if self._state == self.OPEN and time.monotonic() >= self._opened_at + self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+
+    def _open(self):
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.times_opened += 1
+        print(f"[AVISO] Circuito '{self.name}' aberto")
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._calls.clear()
+        print(f"[INFO] Circuito '{self.name}' fechado")
+
+    def _rates(self):
+        now = time.monotonic()
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+        total = len(self._calls)
+        if not total:
+            return total, 0.0, 0.0
+        failures = sum(1 for _, success, _ in self._calls if not success)
+        slow = sum(1 for _, _, is_slow in self._calls if is_slow)
+        return total, failures / total, slow / total
+
+    def allow_request(self):
+        with self._lock:
+            self._check_open_timeout()
+
+            if self._state == self.OPEN:
+                self.rejected_calls += 1
+                return False
+
+            if self._state == self.HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_calls:
+                    self.rejected_calls += 1
+                    return False
+                self._probes_in_flight += 1
+
+            self.total_calls += 1
+            return True
+
+    def record(self, success, latency):
+        with self._lock:
+            slow = latency >= self.slow_call_seconds
+
+            if self._state == self.HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not success or slow:
+                    self._open()
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        self._close()
+                return
+
+            # Resultado de chamada iniciada antes de o circuito abrir
+            if self._state == self.OPEN:
+                return
+
+            self._calls.append((time.monotonic(), success, slow))
+            total, failure_rate, slow_rate = self._rates()
+            if total >= self.min_calls and (failure_rate >= self.failure_rate or slow_rate >= self.slow_call_rate):
+                self._open()
+
+    def call(self, func, *args, is_failure=None, **kwargs):
+        if not self.allow_request():
+            raise ServiceUnavailableException(f"Serviço '{self.name}' temporariamente indisponível.")
+
+        start = time.monotonic()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            self.record(False, time.monotonic() - start)
+            raise
+
+        self.record(not (is_failure and is_failure(result)), time.monotonic() - start)
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            self._check_open_timeout()
+            total, failure_rate, slow_rate = self._rates()
+            retry_in = None
+            if self._state == self.OPEN:
+                retry_in = round(max(0, self._opened_at + self.open_seconds - time.monotonic()), 1)
+
+            return {
+                'name': self.name,
+                'state': self._state,
+                'window_calls': total,
+                'failure_rate': round(failure_rate, 3),
+                'slow_call_rate': round(slow_rate, 3),
+                'retry_in_seconds': retry_in,
+                'total_calls': self.total_calls,
+                'rejected_calls': self.rejected_calls,
+                'times_opened': self.times_opened,
+                'thresholds': {
+                    'failure_rate': self.failure_rate,
+                    'slow_call_rate': self.slow_call_rate,
+                    'slow_call_seconds': self.slow_call_seconds,
+                    'min_calls': self.min_calls,
+                    'open_seconds': self.open_seconds
+                }
+            }
+
+    @classmethod
+    def from_env(cls, name, prefix):
+        def env(key, default, cast=float):
+            return cast(os.environ.get(f"{prefix}_{key}", default))
+
+        return cls(
+            name,
+            failure_rate=env('FAILURE_RATE', 0.5),
+            slow_call_rate=env('SLOW_CALL_RATE', 0.8),
+            slow_call_seconds=env('SLOW_CALL_SECONDS', 2.5),
+            window_size=env('WINDOW_SIZE', 20, int),
+            window_seconds=env('WINDOW_SECONDS', 60),
+            min_calls=env('MIN_CALLS', 10, int),
+            open_seconds=env('OPEN_SECONDS', 30),
+            half_open_calls=env('HALF_OPEN_CALLS', 3, int)
+        )
@@ -0,0 +1,213 @@
+import os
+import time
+import hashlib
+import threading
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from data.db import SessionLocal, CapaCache, CapaOrigem
+from exceptions.custom_exceptions import BadRequestException
+from services.http_client import http_client
+from services.lru_cache import LRUCache
+
+
+class CoverService:
+    CACHE_DIR = os.path.abspath(os.environ.get('COVER_CACHE_DIR', './cover_cache'))
+    MAX_BYTES = int(os.environ.get('COVER_CACHE_MAX_BYTES', 500 * 1024 * 1024))
+    MAX_IMAGE_BYTES = 5 * 1024 * 1024
+    FETCH_TIMEOUT = 5
+    # Evita uma escrita no banco a cada acesso só para atualizar a ordem do LRU
+    TOUCH_INTERVAL = 300
+    # Intervalo para recontar o total em disco, incluindo o que outros workers gravaram
+    TOTAL_RECHECK_INTERVAL = 300
+    # Ao passar do limite, libera até esta fração dele, para as próximas capas não dispararem outra contagem
+    EVICT_TARGET = 0.9
+
+    # Usado apenas para single-flight: capas pedidas ao mesmo tempo são baixadas uma vez
+    _downloads = LRUCache(max_entries=1, ttl=1)
+    # Total em disco estimado por este processo: a contagem completa (_total_bytes) só roda
+    # quando a estimativa passa do limite ou a cada TOTAL_RECHECK_INTERVAL
+    _bytes_estimados = None
+    _bytes_contados_em = 0.0
+    _total_lock = threading.Lock()
+
+    @staticmethod
+    def _blob_path(sha256):
+        return os.path.join(CoverService.CACHE_DIR, sha256[:2], sha256)
+
+    @staticmethod
+    def _lookup(session, google_books_id, size):
+        entry = session.get(CapaCache, (google_books_id, size))
+        if not entry or not os.path.exists(CoverService._blob_path(entry.sha256)):
+            return None
+
+        now = time.time()
+        if now - entry.ultimo_acesso > CoverService.TOUCH_INTERVAL:
+            entry.ultimo_acesso = now
+            session.commit()
+
+        return {
+            'path': CoverService._blob_path(entry.sha256),
+            'content_type': entry.content_type,
+            'etag': entry.sha256
+        }
+
+    @staticmethod
+    def _download(url):
+        # O Google Books devolve links http://; a mesma imagem está disponível via https
+        if url.startswith('http://'):
+            url = 'https://' + url[len('http://'):]
+
+        response = http_client.get(url, timeout=CoverService.FETCH_TIMEOUT, retries=1)
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+
+        if response.status_code != 200 or not content_type.startswith('image/'):
+            return None
+        if len(response.content) > CoverService.MAX_IMAGE_BYTES:
+            return None
+
+        return response.content, content_type
+
+    @staticmethod
+    def _store(session, google_books_id, size, content, content_type):
+        sha256 = hashlib.sha256(content).hexdigest()
+        path = CoverService._blob_path(sha256)
+        added = 0
+
+        if not os.path.exists(path):
+            added = len(content)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+        session.merge(CapaCache(
+            google_books_id=google_books_id,
+            tamanho=size,
+            sha256=sha256,
+            content_type=content_type,
+            bytes=len(content),
+            ultimo_acesso=time.time()
+        ))
+        session.commit()
+
+        CoverService._evict(session, added)
+        return {'path': path, 'content_type': content_type, 'etag': sha256}
+
+    @staticmethod
+    def _total_bytes(session):
+        distinct_blobs = session.query(CapaCache.sha256, func.max(CapaCache.bytes).label('bytes')).group_by(
+            CapaCache.sha256
+        ).subquery()
+        return session.query(func.coalesce(func.sum(distinct_blobs.c.bytes), 0)).scalar()
+
+    @staticmethod
+    def _evict(session, added=0):
+        with CoverService._total_lock:
+            estimated = CoverService._bytes_estimados
+            recente = time.monotonic() - CoverService._bytes_contados_em <= CoverService.TOTAL_RECHECK_INTERVAL
+            if estimated is not None and recente:
+                estimated += added
+                CoverService._bytes_estimados = estimated
+                if estimated <= CoverService.MAX_BYTES:
+                    return
+
+        total = CoverService._total_bytes(session)
+        target = CoverService.MAX_BYTES * CoverService.EVICT_TARGET if total > CoverService.MAX_BYTES else total
+
+        while total > target:
+            oldest = session.query(CapaCache).order_by(CapaCache.ultimo_acesso).first()
+            if not oldest:
+                break
+
+            sha256, size = oldest.sha256, oldest.bytes
+            session.delete(oldest)
+            session.commit()
+
+            # O mesmo arquivo pode servir várias capas (ex.: imagem padrão de "sem capa")
+            if not session.query(CapaCache).filter_by(sha256=sha256).first():
+                try:
+                    os.remove(CoverService._blob_path(sha256))
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+        with CoverService._total_lock:
+            CoverService._bytes_estimados = total
+            CoverService._bytes_contados_em = time.monotonic()
+
+    @staticmethod
+    def remember_sources(books):
+        """Guarda as URLs originais das capas de livros já formatados (ex.: uma página de busca)."""
+        rows = []
+        for book in books:
+            links = {size: url for size, url in (book.get("imageLinks") or {}).items() if url}
+            if links:
+                rows.append({'google_books_id': book['id'], 'links': links, 'atualizado_em': time.time()})
+        if not rows:
+            return
+
+        session = SessionLocal()
+        try:
+            stmt = insert(CapaOrigem)
+            # json_patch mescla os tamanhos: uma busca com projeção não apaga os que já estavam guardados
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['google_books_id'],
+                set_={
+                    'links': func.json_patch(CapaOrigem.links, stmt.excluded.links),
+                    'atualizado_em': stmt.excluded.atualizado_em
+                }
+            ), rows)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Erro ao guardar URLs de capas: {e}")
+        finally:
+            session.close()
+
+    @staticmethod
+    def source_url(google_books_id, size):
+        session = SessionLocal()
+        try:
+            entry = session.get(CapaOrigem, google_books_id)
+            return (entry.links or {}).get(size) if entry else None
+        except Exception as e:
+            print(f"Erro ao ler URLs de capas: {e}")
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_cover(google_books_id, size, source_url_loader):
+        """Retorna o caminho da capa no cache em disco, baixando-a na primeira vez.
+
+        `source_url_loader` só é chamado em caso de cache miss e deve devolver a URL original.
+        """
+        session = SessionLocal()
+        try:
+            cached = CoverService._lookup(session, google_books_id, size)
+            if cached:
+                return cached
+
+            url = source_url_loader()
+            if not url:
+                return None
+
+            downloaded = CoverService._downloads.get_or_load(
+                (google_books_id, size),
+                lambda: CoverService._download(url),
+                should_cache=lambda _: False
+            )
+            if not downloaded:
+                return None
+
+            content, content_type = downloaded
+            return CoverService._store(session, google_books_id, size, content, content_type)
+        except BadRequestException:
+            raise
+        except Exception as e:
+            session.rollback()
+            print(f"Erro ao obter capa {google_books_id}/{size}: {e}")
+            return None
+        finally:
+            session.close()
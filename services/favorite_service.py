@@ -1,9 +1,91 @@
-from data.db import SessionLocal, User
+import os
+from collections import Counter
+from data.db import SessionLocal, User, Favorito, FavoritoVersao
 from exceptions.custom_exceptions import BadRequestException
-from sqlalchemy.orm.attributes import flag_modified
+from services.recommendation_service import RecommendationService
+from services.lru_cache import LRUCache
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 
 class FavoriteService:
+    MAX_IDS_LOTE = 250
+
+    # Chave (usuário, versão) -> (favoritos, versão); favoritos é um dict ordenado (livro -> None):
+    # ordem de inserção e pertinência O(1).
+    # A versão vem de favoritos_versoes, então uma escrita feita por outro worker
+    # invalida o cache deste na leitura seguinte
+    cache = LRUCache(
+        max_entries=int(os.environ.get('FAVORITES_CACHE_ENTRIES', 5000)),
+        ttl=int(os.environ.get('FAVORITES_CACHE_TTL', 600)),
+        max_bytes=int(os.environ.get('FAVORITES_CACHE_BYTES', 16 * 1024 * 1024))
+    )
+
+    @staticmethod
+    def _usuario_existe(session, user_id):
+        return session.query(User.id).filter_by(id=user_id).first() is not None
+
+    @staticmethod
+    def _versao(session, user_id):
+        return session.query(FavoritoVersao.versao).filter_by(usuario_id=user_id).scalar() or 0
+
+    @staticmethod
+    def _incrementar_versao(session, user_id):
+        """Na transação da escrita, que já segura o lock de escrita do SQLite; devolve a nova versão."""
+        stmt = sqlite_insert(FavoritoVersao).values(usuario_id=user_id, versao=1)
+        return session.execute(stmt.on_conflict_do_update(
+            index_elements=['usuario_id'],
+            set_={'versao': FavoritoVersao.versao + 1}
+        ).returning(FavoritoVersao.versao)).scalar()
+
+    @staticmethod
+    def _carregar_favoritos(user_id):
+        """Devolve (favoritos, versão lida depois da lista); favoritos é None se o usuário não existe."""
+        session = SessionLocal()
+        try:
+            favoritos = dict.fromkeys(row[0] for row in session.query(Favorito.google_books_id).filter(
+                Favorito.usuario_id == user_id
+            ).order_by(Favorito.id))
+
+            if not favoritos and not FavoriteService._usuario_existe(session, user_id):
+                return None, None
+            return favoritos, FavoriteService._versao(session, user_id)
+        finally:
+            session.close()
+
+    @staticmethod
+    def _favoritos(user_id):
+        session = SessionLocal()
+        try:
+            versao = FavoriteService._versao(session, user_id)
+        finally:
+            session.close()
+
+        # Se a versão mudou durante a leitura, a lista não corresponde à chave e não vai para o cache
+        favoritos, _ = FavoriteService.cache.get_or_load(
+            (user_id, versao),
+            lambda: FavoriteService._carregar_favoritos(user_id),
+            should_cache=lambda carregado: carregado[0] is not None and carregado[1] == versao
+        )
+        if favoritos is None:
+            raise BadRequestException("Usuário não encontrado.")
+        return favoritos
+
+    @staticmethod
+    def _atualizar_cache(user_id, versao, adicionados=(), removidos=()):
+        """Write-through depois do commit: a entrada da versão anterior, se houver, vira a da nova.
+
+        As versões são sequenciais por usuário, então versão anterior + esta mudança
+        é exatamente o estado da nova versão.
+        """
+        anterior = FavoriteService.cache.pop((user_id, versao - 1))
+        if anterior is None:
+            return
+
+        removidos = set(removidos)
+        favoritos = {bid: None for bid in anterior[0] if bid not in removidos}
+        favoritos.update(dict.fromkeys(adicionados))
+        FavoriteService.cache.set((user_id, versao), (favoritos, versao))
 
     @staticmethod
     def add_favorite(user_id, book_id):
@@ -18,32 +100,35 @@ class FavoriteService:
         else:
             book_ids = [book_id]
 
-        unique_book_ids = list(set(book_ids))
-        if len(unique_book_ids) < len(book_ids):
-            duplicates = [bid for bid in book_ids if book_ids.count(bid) > 1]
-            raise BadRequestException(f"IDs duplicados no request: {', '.join(set(duplicates))}")
+        duplicates = [bid for bid, count in Counter(book_ids).items() if count > 1]
+        if duplicates:
+            raise BadRequestException(f"IDs duplicados no request: {', '.join(duplicates)}")
 
         session = SessionLocal()
         try:
-            user = session.query(User).filter_by(id=user_id).first()
-
-            if not user:
+            if not FavoriteService._usuario_existe(session, user_id):
                 raise BadRequestException("Usuário não encontrado.")
 
-            if user.favorite_books is None:
-                user.favorite_books = []
-
-            already_in = [bid for bid in unique_book_ids if bid in user.favorite_books]
+            # ON CONFLICT em vez de consultar antes: dois pedidos simultâneos do mesmo livro
+            # não esbarram na restrição única, e o RETURNING diz o que entrou de fato
+            inseridos = {row[0] for row in session.execute(
+                sqlite_insert(Favorito)
+                .values([{'usuario_id': user_id, 'google_books_id': bid} for bid in book_ids])
+                .on_conflict_do_nothing(index_elements=['usuario_id', 'google_books_id'])
+                .returning(Favorito.google_books_id)
+            )}
+            already_in = [bid for bid in book_ids if bid not in inseridos]
             if already_in:
+                session.rollback()
                 raise BadRequestException(f"Livros já nos favoritos: {', '.join(already_in)}")
 
-            user.favorite_books.extend(unique_book_ids)
-
-            flag_modified(user, "favorite_books")
+            RecommendationService.marcar_pendentes(session, book_ids)
+            versao = FavoriteService._incrementar_versao(session, user_id)
             session.commit()
+            FavoriteService._atualizar_cache(user_id, versao, adicionados=book_ids)
 
             return {
-                "message": f"Livros adicionados com sucesso: {', '.join(unique_book_ids)}"
+                "message": f"Livros adicionados com sucesso: {', '.join(book_ids)}"
             }
         except BadRequestException:
             raise
@@ -63,24 +148,27 @@ class FavoriteService:
 
         session = SessionLocal()
         try:
-            user = session.query(User).filter_by(id=user_id).first()
+            resultado = session.execute(delete(Favorito).where(
+                Favorito.usuario_id == user_id,
+                Favorito.google_books_id == book_id
+            ))
 
-            if not user:
-                raise BadRequestException("Usuário não encontrado.")
-
-            if user.favorite_books is None or book_id not in user.favorite_books:
+            if not resultado.rowcount:
+                if not FavoriteService._usuario_existe(session, user_id):
+                    raise BadRequestException("Usuário não encontrado.")
                 raise BadRequestException("Livro não encontrado nos favoritos.")
 
-            user.favorite_books.remove(book_id)
-
-            flag_modified(user, "favorite_books")
+            RecommendationService.marcar_pendentes(session, [book_id])
+            versao = FavoriteService._incrementar_versao(session, user_id)
 
             session.commit()
+            FavoriteService._atualizar_cache(user_id, versao, removidos=[book_id])
 
             return {
                 "message": "Livro removido dos favoritos com sucesso!"
             }
         except BadRequestException:
+            session.rollback()
             raise
         except Exception as e:
             session.rollback()
@@ -93,19 +181,11 @@ class FavoriteService:
         if not user_id or not user_id.strip():
             raise BadRequestException("O ID do usuário é obrigatório.")
 
-        session = SessionLocal()
-        try:
-            user = session.query(User).filter_by(id=user_id).first()
-
-            if not user:
-                raise BadRequestException("Usuário não encontrado.")
-
-            return {
-                "total": len(user.favorite_books or []),
-                "favorite_books": user.favorite_books or []
-            }
-        finally:
-            session.close()
+        favorite_books = list(FavoriteService._favoritos(user_id))
+        return {
+            "total": len(favorite_books),
+            "favorite_books": favorite_books
+        }
 
     @staticmethod
     def is_favorite(user_id, book_id):
@@ -115,13 +195,84 @@ class FavoriteService:
         if not book_id or not book_id.strip():
             raise BadRequestException("O ID do livro é obrigatório.")
 
+        return book_id in FavoriteService._favoritos(user_id)
+
+    @staticmethod
+    def _validar_lote(book_ids, campo):
+        if book_ids is None:
+            return []
+        if not isinstance(book_ids, list) or not all(isinstance(bid, str) and bid.strip() for bid in book_ids):
+            raise BadRequestException(f"O campo '{campo}' deve ser uma lista de IDs de livros.")
+        book_ids = list(dict.fromkeys(bid.strip() for bid in book_ids))
+        if len(book_ids) > FavoriteService.MAX_IDS_LOTE:
+            raise BadRequestException(f"Máximo de {FavoriteService.MAX_IDS_LOTE} livros por requisição.")
+        return book_ids
+
+    @staticmethod
+    def check_favorites(user_id, book_ids):
+        """Retorna, na ordem pedida, quais dos livros informados estão nos favoritos."""
+        if not user_id or not user_id.strip():
+            raise BadRequestException("O ID do usuário é obrigatório.")
+
+        book_ids = FavoriteService._validar_lote(book_ids, 'book_ids')
+        if not book_ids:
+            return []
+
+        favoritos = FavoriteService._favoritos(user_id)
+        return [bid for bid in book_ids if bid in favoritos]
+
+    @staticmethod
+    def update_favorites(user_id, add=None, remove=None):
+        """Aplica adições e remoções em uma única transação.
+
+        Diferente de add_favorite/remove_favorite, é idempotente: livros que já
+        estão (ou já não estão) nos favoritos são ignorados.
+        """
+        if not user_id or not user_id.strip():
+            raise BadRequestException("O ID do usuário é obrigatório.")
+
+        add = FavoriteService._validar_lote(add, 'add')
+        remove = FavoriteService._validar_lote(remove, 'remove')
+        conflitos = set(add) & set(remove)
+        if conflitos:
+            raise BadRequestException(f"Livros em 'add' e 'remove' ao mesmo tempo: {', '.join(sorted(conflitos))}")
+        if not add and not remove:
+            raise BadRequestException("Informe ao menos um livro em 'add' ou 'remove'.")
+
         session = SessionLocal()
         try:
-            user = session.query(User).filter_by(id=user_id).first()
-
-            if not user:
+            if not FavoriteService._usuario_existe(session, user_id):
                 raise BadRequestException("Usuário não encontrado.")
 
-            return book_id in (user.favorite_books or [])
+            # O RETURNING diz o que mudou de fato, mesmo com outra escrita simultânea nos mesmos livros
+            inseridos, apagados = set(), set()
+            if add:
+                inseridos = {row[0] for row in session.execute(
+                    sqlite_insert(Favorito)
+                    .values([{'usuario_id': user_id, 'google_books_id': bid} for bid in add])
+                    .on_conflict_do_nothing(index_elements=['usuario_id', 'google_books_id'])
+                    .returning(Favorito.google_books_id)
+                )}
+            if remove:
+                apagados = {row[0] for row in session.execute(delete(Favorito).where(
+                    Favorito.usuario_id == user_id,
+                    Favorito.google_books_id.in_(remove)
+                ).returning(Favorito.google_books_id))}
+            added = [bid for bid in add if bid in inseridos]
+            removed = [bid for bid in remove if bid in apagados]
+
+            if added or removed:
+                RecommendationService.marcar_pendentes(session, added + removed)
+                versao = FavoriteService._incrementar_versao(session, user_id)
+                session.commit()
+                FavoriteService._atualizar_cache(user_id, versao, adicionados=added, removidos=removed)
+
+            return {"added": added, "removed": removed}
+        except BadRequestException:
+            raise
+        except Exception as e:
+            session.rollback()
+            raise Exception(f"Erro ao atualizar favoritos: {str(e)}")
         finally:
             session.close()
+
@@ -0,0 +1,88 @@
+import os
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpClient:
+    """Cliente HTTP compartilhado para chamadas externas (Google Books, Groq).
+
+    Mantém conexões keep-alive em pools por host e aplica timeout e
+    retentativas com backoff respeitando um prazo absoluto (time.monotonic()).
+    """
+
+    RETRY_STATUS = {500, 502, 503, 504}
+
+    def __init__(self, pool_size=None, pool_hosts=None, default_timeout=10, retries=2, backoff=0.2):
+        self.pool_size = pool_size or int(os.environ.get('HTTP_POOL_SIZE', 20))
+        self.pool_hosts = pool_hosts or int(os.environ.get('HTTP_POOL_HOSTS', 10))
+        self.default_timeout = default_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    # As retentativas são feitas em request() para poder respeitar o prazo
+                    adapter = HTTPAdapter(
+                        pool_connections=self.pool_hosts,
+                        pool_maxsize=self.pool_size,
+                        max_retries=0
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def request(self, method, url, timeout=None, retries=None, deadline=None, **kwargs):
+        timeout = timeout or self.default_timeout
+        retries = self.retries if retries is None else retries
+        session = self._get_session()
+
+        attempt = 0
+        while True:
+            attempt_timeout = timeout
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(f"Prazo esgotado para {method} {url}")
+                attempt_timeout = min(timeout, remaining)
+
+            try:
+                response = session.request(method, url, timeout=attempt_timeout, **kwargs)
+                if response.status_code not in self.RETRY_STATUS or attempt >= retries:
+                    return response
+                error = None
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= retries:
+                    raise
+                error = e
+
+            delay = self.backoff * (2 ** attempt)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                if error is not None:
+                    raise error
+                return response
+
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+http_client = HttpClient()
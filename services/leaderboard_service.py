@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import text, func
+from sqlalchemy.dialects.sqlite import insert
+from data.db import SessionLocal, RankingLivro, RankingParametro, EstatisticaAvaliacao
+from exceptions.custom_exceptions import BadRequestException
+
+
+class LeaderboardService:
+    # Janela em dias de cada período; None = todas as avaliações
+    PERIODOS = {'geral': None, '30d': 30, '7d': 7}
+    TIPOS = ('melhor_avaliados', 'mais_avaliados')
+    PESO = float(os.environ.get('LEADERBOARD_PRIOR_WEIGHT', 10))
+    MEDIA_PADRAO = 3.0
+    # As janelas de tempo só "andam" na reconstrução completa, feita em segundo plano quando vence
+    INTERVALO_RECONSTRUCAO = int(os.environ.get('LEADERBOARD_REBUILD_SECONDS', 3600))
+    MAX_LIMITE = 100
+
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='leaderboards')
+    _reconstruindo = False
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _inicio_janela(dias):
+        # Mesmo formato de texto do CURRENT_TIMESTAMP do SQLite (UTC)
+        inicio = datetime.now(timezone.utc) - timedelta(days=dias)
+        return inicio.strftime('%Y-%m-%d %H:%M:%S')
+
+    @staticmethod
+    def _parametros(session, periodo):
+        parametro = session.get(RankingParametro, periodo)
+        if parametro:
+            return parametro.media_global, parametro.peso
+        return LeaderboardService.MEDIA_PADRAO, LeaderboardService.PESO
+
+    @staticmethod
+    def _agregado_livro(session, google_books_id, dias):
+        if dias is None:
+            stats = session.get(EstatisticaAvaliacao, google_books_id)
+            return (stats.total, stats.soma) if stats else (0, 0)
+
+        row = session.execute(
+            text(
+                "SELECT COUNT(*), COALESCE(SUM(estrelas), 0) FROM avaliacoes "
+                "WHERE google_books_id = :id AND data_avaliacao >= :inicio"
+            ),
+            {"id": google_books_id, "inicio": LeaderboardService._inicio_janela(dias)}
+        ).one()
+        return row[0], row[1]
+
+    @staticmethod
+    def atualizar_livros(session, google_books_ids):
+        """Recalcula apenas os livros alterados, dentro da transação de quem escreveu a avaliação."""
+        for periodo, dias in LeaderboardService.PERIODOS.items():
+            media_global, peso = LeaderboardService._parametros(session, periodo)
+
+            for google_books_id in set(google_books_ids):
+                total, soma = LeaderboardService._agregado_livro(session, google_books_id, dias)
+
+                if total <= 0:
+                    session.query(RankingLivro).filter_by(
+                        periodo=periodo, google_books_id=google_books_id
+                    ).delete()
+                    continue
+
+                valores = {
+                    'total': total,
+                    'soma': soma,
+                    'score': (peso * media_global + soma) / (peso + total)
+                }
+                session.execute(
+                    insert(RankingLivro).values(periodo=periodo, google_books_id=google_books_id, **valores)
+                    .on_conflict_do_update(index_elements=['periodo', 'google_books_id'], set_=valores)
+                )
+
+    @staticmethod
+    def reconstruir():
+        session = SessionLocal()
+        try:
+            for periodo, dias in LeaderboardService.PERIODOS.items():
+                if dias is None:
+                    origem = "SELECT google_books_id, total, soma FROM estatisticas_avaliacoes WHERE total > 0"
+                    params = {}
+                else:
+                    origem = (
+                        "SELECT google_books_id, COUNT(*) AS total, SUM(estrelas) AS soma FROM avaliacoes "
+                        "WHERE data_avaliacao >= :inicio GROUP BY google_books_id"
+                    )
+                    params = {"inicio": LeaderboardService._inicio_janela(dias)}
+
+                totais = session.execute(
+                    text(f"SELECT SUM(total), SUM(soma) FROM ({origem})"), params
+                ).one()
+                media_global = totais[1] / totais[0] if totais[0] else LeaderboardService.MEDIA_PADRAO
+                peso = LeaderboardService.PESO
+
+                session.query(RankingLivro).filter_by(periodo=periodo).delete()
+                session.execute(
+                    text(
+                        "INSERT INTO ranking_livros (periodo, google_books_id, total, soma, score) "
+                        "SELECT :periodo, google_books_id, total, soma, "
+                        f"(:peso * :media + soma) / (:peso + total) FROM ({origem})"
+                    ),
+                    {"periodo": periodo, "peso": peso, "media": media_global, **params}
+                )
+                session.merge(RankingParametro(
+                    periodo=periodo, media_global=media_global, peso=peso, atualizado_em=time.time()
+                ))
+
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def _reconstruir_em_segundo_plano():
+        try:
+            LeaderboardService.reconstruir()
+        except Exception as e:
+            print(f"Erro ao reconstruir rankings: {e}")
+        finally:
+            with LeaderboardService._lock:
+                LeaderboardService._reconstruindo = False
+
+    @staticmethod
+    def _agendar_reconstrucao_se_vencido(session):
+        ultima = session.query(func.min(RankingParametro.atualizado_em)).scalar()
+        if ultima and time.time() - ultima < LeaderboardService.INTERVALO_RECONSTRUCAO:
+            return
+
+        with LeaderboardService._lock:
+            if LeaderboardService._reconstruindo:
+                return
+            LeaderboardService._reconstruindo = True
+        LeaderboardService._executor.submit(LeaderboardService._reconstruir_em_segundo_plano)
+
+    @staticmethod
+    def obter_ranking(tipo, periodo='geral', limite=20, offset=0):
+        if tipo not in LeaderboardService.TIPOS:
+            raise BadRequestException(f"Tipo de ranking inválido. Use: {', '.join(LeaderboardService.TIPOS)}.")
+        if periodo not in LeaderboardService.PERIODOS:
+            raise BadRequestException(f"Período inválido. Use: {', '.join(LeaderboardService.PERIODOS)}.")
+
+        limite = max(1, min(limite or 20, LeaderboardService.MAX_LIMITE))
+        offset = max(0, offset or 0)
+
+        session = SessionLocal()
+        try:
+            LeaderboardService._agendar_reconstrucao_se_vencido(session)
+
+            if tipo == 'melhor_avaliados':
+                ordem = (RankingLivro.score.desc(), RankingLivro.total.desc())
+            else:
+                ordem = (RankingLivro.total.desc(), RankingLivro.score.desc())
+
+            rows = session.query(RankingLivro).filter_by(periodo=periodo).order_by(
+                *ordem
+            ).offset(offset).limit(limite + 1).all()
+
+            return {
+                'tipo': tipo,
+                'periodo': periodo,
+                'livros': [{
+                    'posicao': offset + posicao + 1,
+                    'google_books_id': row.google_books_id,
+                    'media': round(row.soma / row.total, 1),
+                    'score': round(row.score, 3),
+                    'total_avaliacoes': row.total
+                } for posicao, row in enumerate(rows[:limite])],
+                'next_offset': offset + limite if len(rows) > limite else None
+            }
+        finally:
+            session.close()
@@ -0,0 +1,161 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+
+
+def _default_sizeof(value):
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return 0
+
+
+class _InFlight:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class LRUCache:
+    """Cache em memória com LRU, TTL, orçamento de memória e single-flight.
+
+    O tamanho de cada valor é estimado por `sizeof` (por padrão o tamanho do JSON).
+    """
+
+    def __init__(self, max_entries=1000, ttl=300, max_bytes=None, sizeof=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or _default_sizeof
+        self._data = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def _remove(self, key):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self):
+        while self._data and (
+            len(self._data) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def get(self, key, default=None):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        size = self.sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            # TTL <= 0 ou valor maior que o orçamento não é guardado, e o valor antigo da chave sai junto
+            if (ttl is not None and ttl <= 0) or (self.max_bytes is not None and size > self.max_bytes):
+                return
+            expires_at = time.monotonic() + ttl if ttl is not None else None
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+
+    def pop(self, key, default=None):
+        """Remove e devolve o valor sem contar como acesso nas estatísticas (write-through)."""
+        with self._lock:
+            found, value = self._lookup(key)
+            if not found:
+                return default
+            self._remove(key)
+            return value
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def get_or_load(self, key, loader, should_cache=None, ttl=None):
+        """Retorna o valor em cache ou executa `loader()` uma única vez por chave,
+        mesmo com várias threads pedindo a mesma chave ao mesmo tempo.
+
+        `ttl` pode ser um número ou uma função do valor carregado (None usa o TTL padrão).
+        """
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            self.misses += 1
+
+            inflight = self._inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = _InFlight()
+                self._inflight[key] = inflight
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            inflight.event.wait()
+            if inflight.error is not None:
+                raise inflight.error
+            return inflight.value
+
+        try:
+            value = loader()
+            inflight.value = value
+            if should_cache is None or should_cache(value):
+                self.set(key, value, ttl=ttl(value) if callable(ttl) else ttl)
+            return value
+        except Exception as e:
+            inflight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.event.set()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0
+            }
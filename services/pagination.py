@@ -0,0 +1,53 @@
+import base64
+from sqlalchemy import String, cast, literal, tuple_
+from exceptions.custom_exceptions import BadRequestException
+
+# Paginação por cursor (keyset) sobre (data, id) em ordem decrescente.
+# A data entra no cursor como o texto gravado pelo SQLite, para que a comparação
+# no banco seja exata mesmo quando várias linhas têm o mesmo timestamp.
+
+
+def raw_timestamp(column):
+    return cast(column, String)
+
+
+def encode_cursor(timestamp_raw, row_id):
+    value = f"{timestamp_raw or ''}|{row_id}"
+    return base64.urlsafe_b64encode(value.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp_raw, row_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8').split('|', 1)
+    except Exception:
+        raise BadRequestException("Cursor inválido.")
+    if not row_id:
+        raise BadRequestException("Cursor inválido.")
+    return timestamp_raw, row_id
+
+
+def clamp_limit(limite, default, maximum=100):
+    try:
+        limite = int(limite) if limite is not None else default
+    except (TypeError, ValueError):
+        raise BadRequestException("O parâmetro 'limite' deve ser um número inteiro.")
+    return max(1, min(limite, maximum))
+
+
+def apply_keyset(query, timestamp_column, id_column, cursor, limite):
+    """Ordena por (data, id) decrescente, aplica o cursor e busca uma linha a mais
+    para saber se existe próxima página."""
+    if cursor:
+        timestamp_raw, row_id = decode_cursor(cursor)
+        query = query.filter(
+            tuple_(timestamp_column, id_column) < tuple_(literal(timestamp_raw, String), literal(row_id, String))
+        )
+    return query.order_by(timestamp_column.desc(), id_column.desc()).limit(limite + 1)
+
+
+def split_page(rows, limite, timestamp_of, id_of):
+    has_more = len(rows) > limite
+    rows = rows[:limite]
+    next_cursor = encode_cursor(timestamp_of(rows[-1]), id_of(rows[-1])) if has_more and rows else None
+    return rows, next_cursor
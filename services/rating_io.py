@@ -0,0 +1,59 @@
+import csv
+import io
+import json
+
+# Leitura e escrita de avaliações em CSV/NDJSON para importação e exportação em lote
+
+CAMPOS_EXPORTACAO = ['id', 'google_books_id', 'usuario_id', 'estrelas', 'comentario', 'data_avaliacao']
+
+
+def detectar_formato(caminho, formato=None):
+    if formato:
+        return formato.lower()
+    return 'csv' if caminho.lower().endswith('.csv') else 'ndjson'
+
+
+def ler_linhas(arquivo, formato):
+    """Gera (numero_da_linha, registro, erro) sem carregar o arquivo inteiro em memória."""
+    if formato == 'csv':
+        leitor = csv.DictReader(arquivo)
+        for registro in leitor:
+            yield leitor.line_num, registro, None
+        return
+
+    if formato != 'ndjson':
+        raise ValueError(f"Formato não suportado: {formato}")
+
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            registro = json.loads(linha)
+        except json.JSONDecodeError as e:
+            yield numero, None, f"JSON inválido: {e.msg}"
+            continue
+        if not isinstance(registro, dict):
+            yield numero, None, "Cada linha deve ser um objeto JSON"
+            continue
+        yield numero, registro, None
+
+
+def escrever_linhas(registros, formato):
+    if formato == 'csv':
+        buffer = io.StringIO()
+        escritor = csv.DictWriter(buffer, fieldnames=CAMPOS_EXPORTACAO)
+        escritor.writeheader()
+        yield buffer.getvalue()
+        for registro in registros:
+            buffer.seek(0)
+            buffer.truncate()
+            escritor.writerow(registro)
+            yield buffer.getvalue()
+        return
+
+    if formato != 'ndjson':
+        raise ValueError(f"Formato não suportado: {formato}")
+
+    for registro in registros:
+        yield json.dumps(registro, ensure_ascii=False) + '\n'
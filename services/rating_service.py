@@ -1,8 +1,15 @@
-from typing import Optional, Dict, List
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Optional, Dict, List, Iterable, Iterator
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from data.db import Avaliacao, User
+from sqlalchemy import func, delete, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.sqlite import insert
+from data.db import Avaliacao, User, EstatisticaAvaliacao, rebuild_rating_stats
 from exceptions.custom_exceptions import BadRequestException
+from services.pagination import raw_timestamp, apply_keyset, split_page, clamp_limit
+from services.leaderboard_service import LeaderboardService
 
 
 class RatingService:
@@ -14,6 +21,15 @@ class RatingService:
     def _validar_estrelas(estrelas: int) -> bool:
         return isinstance(estrelas, int) and 1 <= estrelas <= 5
 
+    def reconstruir_estatisticas(self) -> int:
+        try:
+            rebuild_rating_stats(self.db)
+            self.db.commit()
+            return self.db.query(func.count(EstatisticaAvaliacao.google_books_id)).scalar()
+        except Exception as e:
+            self.db.rollback()
+            raise Exception(f"Erro ao reconstruir estatísticas: {str(e)}")
+
     def adicionar_avaliacao(self, google_books_id: str, usuario_id: str,
                             estrelas: int, comentario: Optional[str] = None) -> Dict:
         if not self._validar_estrelas(estrelas):
@@ -22,126 +38,301 @@ class RatingService:
         if not google_books_id or not google_books_id.strip():
             raise BadRequestException("O ID do livro é obrigatório.")
 
+        # Um único INSERT ... ON CONFLICT DO UPDATE: a chave estrangeira garante que o usuário existe
+        # e o id devolvido indica se a linha foi criada (id novo) ou atualizada (id já existente)
+        novo_id = str(uuid.uuid4())
+        stmt = insert(Avaliacao).values(
+            id=novo_id,
+            google_books_id=google_books_id,
+            usuario_id=usuario_id,
+            estrelas=estrelas,
+            comentario=comentario
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['google_books_id', 'usuario_id'],
+            set_={
+                'estrelas': stmt.excluded.estrelas,
+                'comentario': stmt.excluded.comentario,
+                'data_avaliacao': text('CURRENT_TIMESTAMP')
+            }
+        ).returning(Avaliacao.id)
+
         try:
-            usuario = self.db.query(User).filter_by(id=usuario_id).first()
-            if not usuario:
+            avaliacao_id = self.db.execute(stmt).scalar_one()
+            LeaderboardService.atualizar_livros(self.db, [google_books_id])
+            self.db.commit()
+        except IntegrityError as e:
+            self.db.rollback()
+            if 'FOREIGN KEY' in str(e.orig):
                 raise BadRequestException("Usuário não encontrado.")
+            raise Exception(f"Erro ao adicionar avaliação: {str(e)}")
+        except Exception as e:
+            self.db.rollback()
+            raise Exception(f"Erro ao adicionar avaliação: {str(e)}")
 
-            avaliacao_existente = self.db.query(Avaliacao).filter_by(
-                google_books_id=google_books_id,
-                usuario_id=usuario_id
-            ).first()
-
-            if avaliacao_existente:
-                avaliacao_existente.estrelas = estrelas
-                avaliacao_existente.comentario = comentario
-                mensagem = "Avaliação atualizada com sucesso!"
-            else:
-                nova_avaliacao = Avaliacao(
-                    google_books_id=google_books_id,
-                    usuario_id=usuario_id,
-                    estrelas=estrelas,
-                    comentario=comentario
-                )
-                self.db.add(nova_avaliacao)
-                mensagem = "Avaliação adicionada com sucesso!"
+        if avaliacao_id == novo_id:
+            return {"message": "Avaliação adicionada com sucesso!"}
+        return {"message": "Avaliação atualizada com sucesso!"}
 
+    def remover_avaliacao(self, google_books_id: str, usuario_id: str) -> bool:
+        try:
+            resultado = self.db.execute(delete(Avaliacao).where(
+                Avaliacao.google_books_id == google_books_id,
+                Avaliacao.usuario_id == usuario_id
+            ))
+            if resultado.rowcount:
+                LeaderboardService.atualizar_livros(self.db, [google_books_id])
             self.db.commit()
-            return {"message": mensagem}
+            return resultado.rowcount > 0
 
-        except BadRequestException:
-            raise
-        except ValueError:
-            raise
         except Exception as e:
             self.db.rollback()
-            raise Exception(f"Erro ao adicionar avaliação: {str(e)}")
+            raise Exception(f"Erro ao remover avaliação: {str(e)}")
+
+    @staticmethod
+    def _validar_linha_importacao(registro: Dict) -> Dict:
+        google_books_id = str(registro.get('google_books_id') or '').strip()
+        usuario_id = str(registro.get('usuario_id') or '').strip()
+        if not google_books_id:
+            raise ValueError("google_books_id é obrigatório")
+        if not usuario_id:
+            raise ValueError("usuario_id é obrigatório")
 
-    def remover_avaliacao(self, google_books_id: str, usuario_id: str) -> bool:
         try:
-            avaliacao = self.db.query(Avaliacao).filter_by(
-                google_books_id=google_books_id,
-                usuario_id=usuario_id
-            ).first()
+            estrelas = int(registro.get('estrelas'))
+        except (TypeError, ValueError):
+            raise ValueError("estrelas deve ser um número entre 1 e 5")
+        if not 1 <= estrelas <= 5:
+            raise ValueError("estrelas deve ser um número entre 1 e 5")
 
-            if avaliacao:
-                self.db.delete(avaliacao)
+        data = registro.get('data_avaliacao')
+        if data:
+            try:
+                data = datetime.fromisoformat(str(data).replace('Z', '+00:00'))
+            except ValueError:
+                raise ValueError("data_avaliacao deve estar no formato ISO 8601")
+            if data.tzinfo:
+                data = data.astimezone(timezone.utc).replace(tzinfo=None)
+        else:
+            data = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        return {
+            'id': str(uuid.uuid4()),
+            'google_books_id': google_books_id,
+            'usuario_id': usuario_id,
+            'estrelas': estrelas,
+            'comentario': registro.get('comentario') or None,
+            'data_avaliacao': data.replace(microsecond=0)
+        }
+
+    def _gravar_lote(self, linhas: List[Dict]) -> None:
+        stmt = insert(Avaliacao)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['google_books_id', 'usuario_id'],
+            set_={
+                'estrelas': stmt.excluded.estrelas,
+                'comentario': stmt.excluded.comentario,
+                'data_avaliacao': stmt.excluded.data_avaliacao
+            }
+        )
+        self.db.execute(stmt, linhas)
+        LeaderboardService.atualizar_livros(self.db, [linha['google_books_id'] for linha in linhas])
+
+    def importar_avaliacoes(self, registros: Iterable, tamanho_lote: int = 1000) -> Dict:
+        """Importa (numero_da_linha, registro, erro) em lotes, um upsert executemany e um commit por lote.
+
+        Linhas inválidas não interrompem a importação; são devolvidas em 'erros'.
+        """
+        importadas = 0
+        erros = []
+        registros = iter(registros)
+
+        while True:
+            lote = list(islice(registros, tamanho_lote))
+            if not lote:
+                break
+
+            validas = []
+            for numero, registro, erro in lote:
+                if erro:
+                    erros.append({'linha': numero, 'erro': erro})
+                    continue
+                try:
+                    validas.append((numero, self._validar_linha_importacao(registro)))
+                except ValueError as e:
+                    erros.append({'linha': numero, 'erro': str(e)})
+
+            usuarios = {linha['usuario_id'] for _, linha in validas}
+            existentes = {row.id for row in self.db.query(User.id).filter(User.id.in_(usuarios))} if usuarios else set()
+            linhas = []
+            for numero, linha in validas:
+                if linha['usuario_id'] in existentes:
+                    linhas.append((numero, linha))
+                else:
+                    erros.append({'linha': numero, 'erro': "Usuário não encontrado"})
+
+            if not linhas:
+                continue
+
+            try:
+                self._gravar_lote([linha for _, linha in linhas])
                 self.db.commit()
-                return True
+                importadas += len(linhas)
+            except Exception:
+                self.db.rollback()
+                # Falha inesperada no lote: regravar linha a linha para apontar quais falharam
+                for numero, linha in linhas:
+                    try:
+                        self._gravar_lote([linha])
+                        self.db.commit()
+                        importadas += 1
+                    except Exception as e:
+                        self.db.rollback()
+                        erros.append({'linha': numero, 'erro': str(getattr(e, 'orig', e))})
 
-            return False
+        return {'importadas': importadas, 'erros': sorted(erros, key=lambda erro: erro['linha'])}
 
-        except Exception as e:
-            self.db.rollback()
-            raise Exception(f"Erro ao remover avaliação: {str(e)}")
+    def exportar_avaliacoes(self, tamanho_lote: int = 5000) -> Iterator[Dict]:
+        query = self.db.query(
+            Avaliacao.id,
+            Avaliacao.google_books_id,
+            Avaliacao.usuario_id,
+            Avaliacao.estrelas,
+            Avaliacao.comentario,
+            Avaliacao.data_avaliacao
+        ).order_by(Avaliacao.id)
+
+        # Paginação por id para não manter um cursor aberto durante toda a exportação
+        ultimo_id = None
+        while True:
+            pagina = query.filter(Avaliacao.id > ultimo_id) if ultimo_id else query
+            rows = pagina.limit(tamanho_lote).all()
+            if not rows:
+                break
+
+            for row in rows:
+                yield {
+                    'id': row.id,
+                    'google_books_id': row.google_books_id,
+                    'usuario_id': row.usuario_id,
+                    'estrelas': row.estrelas,
+                    'comentario': row.comentario,
+                    'data_avaliacao': row.data_avaliacao.isoformat() if row.data_avaliacao else None
+                }
+            ultimo_id = rows[-1].id
+
+    MAX_LIVROS_LOTE = 250
+
+    @staticmethod
+    def _formatar_estatisticas(stats: EstatisticaAvaliacao) -> Dict:
+        return {
+            'google_books_id': stats.google_books_id,
+            'media': round(stats.soma / stats.total, 1),
+            'total_avaliacoes': stats.total,
+            'distribuicao': {
+                5: stats.estrelas_5,
+                4: stats.estrelas_4,
+                3: stats.estrelas_3,
+                2: stats.estrelas_2,
+                1: stats.estrelas_1
+            }
+        }
 
     def obter_estatisticas(self, google_books_id: str) -> Optional[Dict]:
         try:
-            stats = self.db.query(
-                func.avg(Avaliacao.estrelas).label('media'),
-                func.count(Avaliacao.id).label('total')
-            ).filter(Avaliacao.google_books_id == google_books_id).first()
+            stats = self.db.get(EstatisticaAvaliacao, google_books_id)
 
-            if stats.total == 0:
+            if not stats or stats.total <= 0:
                 return None
 
-            distribuicao_query = self.db.query(
-                Avaliacao.estrelas,
-                func.count(Avaliacao.id).label('quantidade')
-            ).filter(
-                Avaliacao.google_books_id == google_books_id
-            ).group_by(Avaliacao.estrelas).all()
+            return self._formatar_estatisticas(stats)
+        except Exception as e:
+            raise Exception(f"Erro ao obter estatísticas: {str(e)}")
 
-            distribuicao = {row[0]: row[1] for row in distribuicao_query}
+    def obter_estatisticas_lote(self, google_books_ids: List[str]) -> Dict[str, Dict]:
+        """Estatísticas de vários livros em uma única leitura; livros sem avaliações são omitidos"""
+        if not isinstance(google_books_ids, list) or not google_books_ids:
+            raise BadRequestException("O campo 'google_books_ids' deve ser uma lista de IDs de livros.")
 
-            return {
-                'google_books_id': google_books_id,
-                'media': round(stats.media, 1) if stats.media else 0,
-                'total_avaliacoes': stats.total,
-                'distribuicao': {
-                    5: distribuicao.get(5, 0),
-                    4: distribuicao.get(4, 0),
-                    3: distribuicao.get(3, 0),
-                    2: distribuicao.get(2, 0),
-                    1: distribuicao.get(1, 0)
-                }
-            }
+        ids = list(dict.fromkeys(str(i).strip() for i in google_books_ids if i and str(i).strip()))
+        if len(ids) > self.MAX_LIVROS_LOTE:
+            raise BadRequestException(f"Máximo de {self.MAX_LIVROS_LOTE} livros por requisição.")
+
+        try:
+            rows = self.db.query(EstatisticaAvaliacao).filter(
+                EstatisticaAvaliacao.google_books_id.in_(ids),
+                EstatisticaAvaliacao.total > 0
+            ).all()
+
+            return {stats.google_books_id: self._formatar_estatisticas(stats) for stats in rows}
         except Exception as e:
             raise Exception(f"Erro ao obter estatísticas: {str(e)}")
 
-    def obter_avaliacoes(self, google_books_id: str, limite: int = 10) -> List[Dict]:
+    def obter_avaliacoes(self, google_books_id: str, limite: int = 10, cursor: Optional[str] = None) -> Dict:
+        limite = clamp_limit(limite, 10)
         try:
-            avaliacoes = self.db.query(Avaliacao).join(User).filter(
+            # Apenas as colunas usadas, num único SELECT com JOIN, sem montar entidades do ORM
+            query = self.db.query(
+                Avaliacao.id,
+                Avaliacao.usuario_id,
+                User.username,
+                Avaliacao.estrelas,
+                Avaliacao.comentario,
+                Avaliacao.data_avaliacao,
+                raw_timestamp(Avaliacao.data_avaliacao).label('data_raw')
+            ).select_from(Avaliacao).join(User, User.id == Avaliacao.usuario_id).filter(
                 Avaliacao.google_books_id == google_books_id
-            ).order_by(Avaliacao.data_avaliacao.desc()).limit(limite).all()
+            )
+            rows = apply_keyset(query, Avaliacao.data_avaliacao, Avaliacao.id, cursor, limite).all()
+            rows, next_cursor = split_page(rows, limite, lambda row: row.data_raw, lambda row: row.id)
 
-            return [{
-                'id': str(av.id),
-                'usuario_id': str(av.usuario_id),
-                'usuario_nome': av.usuario.username,
-                'estrelas': av.estrelas,
-                'comentario': av.comentario,
-                'data_avaliacao': av.data_avaliacao.isoformat() if av.data_avaliacao else None
-            } for av in avaliacoes]
+            return {
+                'avaliacoes': [{
+                    'id': str(row.id),
+                    'usuario_id': str(row.usuario_id),
+                    'usuario_nome': row.username,
+                    'estrelas': row.estrelas,
+                    'comentario': row.comentario,
+                    'data_avaliacao': row.data_avaliacao.isoformat() if row.data_avaliacao else None
+                } for row in rows],
+                'next_cursor': next_cursor
+            }
 
+        except BadRequestException:
+            raise
         except Exception as e:
             raise Exception(f"Erro ao obter avaliações: {str(e)}")
 
-    def obter_avaliacoes_usuario(self, usuario_id: str) -> List[Dict]:
-        """Obter todas as avaliações de um usuário específico"""
+    def obter_avaliacoes_usuario(self, usuario_id: str, limite: int = 50, cursor: Optional[str] = None) -> Dict:
+        """Obter as avaliações de um usuário específico, paginadas por cursor"""
+        limite = clamp_limit(limite, 50)
         try:
-            avaliacoes = self.db.query(Avaliacao).filter(
+            query = self.db.query(
+                Avaliacao.id,
+                Avaliacao.google_books_id,
+                Avaliacao.estrelas,
+                Avaliacao.comentario,
+                Avaliacao.data_avaliacao,
+                raw_timestamp(Avaliacao.data_avaliacao).label('data_raw')
+            ).filter(
                 Avaliacao.usuario_id == usuario_id
-            ).order_by(Avaliacao.data_avaliacao.desc()).all()
+            )
+            rows = apply_keyset(query, Avaliacao.data_avaliacao, Avaliacao.id, cursor, limite).all()
+            rows, next_cursor = split_page(rows, limite, lambda row: row.data_raw, lambda row: row.id)
 
-            return [{
-                'id': str(av.id),
-                'google_books_id': av.google_books_id,
-                'estrelas': av.estrelas,
-                'comentario': av.comentario,
-                'data_avaliacao': av.data_avaliacao.isoformat() if av.data_avaliacao else None
-            } for av in avaliacoes]
+            return {
+                'avaliacoes': [{
+                    'id': str(row.id),
+                    'google_books_id': row.google_books_id,
+                    'estrelas': row.estrelas,
+                    'comentario': row.comentario,
+                    'data_avaliacao': row.data_avaliacao.isoformat() if row.data_avaliacao else None
+                } for row in rows],
+                'next_cursor': next_cursor
+            }
 
+        except BadRequestException:
+            raise
         except Exception as e:
             raise Exception(f"Erro ao obter avaliações do usuário: {str(e)}")
 
@@ -0,0 +1,359 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy import sparse
+from sqlalchemy import text
+from sqlalchemy.dialects.sqlite import insert
+from data.db import SessionLocal, User, LivroVizinho, RecomendacaoPendente, TarefaAgendada
+from exceptions.custom_exceptions import BadRequestException
+
+
+class RecommendationService:
+    """Recomendações item a item a partir de avaliações e favoritos.
+
+    As similaridades (cosseno entre colunas da matriz usuário x livro) são
+    calculadas fora das requisições e gravadas em livros_vizinhos; os
+    endpoints apenas leem essas listas.
+    """
+
+    K = int(os.environ.get('RECOMMENDATIONS_K', 20))
+    # Linhas da matriz de similaridade calculadas por vez; limita o pico de memória
+    BLOCO = int(os.environ.get('RECOMMENDATIONS_BLOCK', 1024))
+    SCORE_MINIMO = float(os.environ.get('RECOMMENDATIONS_MIN_SCORE', 0.01))
+    INTERVALO_ATUALIZACAO = int(os.environ.get('RECOMMENDATIONS_REFRESH_SECONDS', 300))
+    # Validade da reserva da atualização em segundo plano, caso o worker que a pegou morra no meio
+    DURACAO_MAXIMA_ATUALIZACAO = int(os.environ.get('RECOMMENDATIONS_REFRESH_LEASE', 1800))
+    TAREFA = 'recomendacoes'
+    PESO_FAVORITO = 1.0
+    MAX_LIMITE = 50
+
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recomendacoes')
+    _atualizando = False
+    _ultima_atualizacao = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def peso_avaliacao(estrelas):
+        # 1 estrela não indica afinidade; 5 estrelas pesa como um favorito
+        return (np.asarray(estrelas, dtype=np.float32) - 1) / 4
+
+    @staticmethod
+    def montar_matriz(usuarios, livros, pesos):
+        """Matriz esparsa usuário x livro (CSR) com colunas normalizadas (norma L2).
+
+        Interações repetidas do mesmo par (avaliação e favorito) ficam com o maior peso.
+        Retorna (matriz, ids_dos_livros).
+        """
+        pesos = np.asarray(pesos, dtype=np.float32)
+        manter = pesos > 0
+        usuario_idx = np.unique(np.asarray(usuarios)[manter], return_inverse=True)[1]
+        ids_livros, livro_idx = np.unique(np.asarray(livros)[manter], return_inverse=True)
+        pesos = pesos[manter]
+
+        if not len(pesos):
+            return sparse.csr_matrix((0, 0), dtype=np.float32), ids_livros
+
+        n_livros = len(ids_livros)
+        chaves = usuario_idx.astype(np.int64) * n_livros + livro_idx
+        ordem = np.argsort(chaves, kind='stable')
+        chaves = chaves[ordem]
+        inicios = np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]])
+        chaves = chaves[inicios]
+        valores = np.maximum.reduceat(pesos[ordem], inicios)
+
+        matriz = sparse.csr_matrix(
+            (valores, (chaves // n_livros, chaves % n_livros)),
+            shape=(int(usuario_idx.max()) + 1, n_livros),
+            dtype=np.float32
+        )
+        normas = np.sqrt(np.asarray(matriz.multiply(matriz).sum(axis=0))).ravel()
+        normas[normas == 0] = 1
+        return sparse.csr_matrix(matriz.multiply(1 / normas)), ids_livros
+
+    @staticmethod
+    def calcular_vizinhos(matriz, colunas=None, k=None, bloco=None):
+        """Top-k livros mais similares para cada coluna em `colunas` (todas por padrão).
+
+        Retorna três arrays (livro, vizinho, score) com índices de coluna da matriz.
+        """
+        k = k or RecommendationService.K
+        bloco = bloco or RecommendationService.BLOCO
+        colunas = np.arange(matriz.shape[1]) if colunas is None else np.asarray(colunas)
+        transposta = matriz.T.tocsr()
+
+        livros, vizinhos, scores = [], [], []
+        for inicio in range(0, len(colunas), bloco):
+            alvo = colunas[inicio:inicio + bloco]
+            similares = (transposta[alvo] @ matriz).tocoo()
+
+            linha_alvo = alvo[similares.row]
+            manter = (similares.col != linha_alvo) & (similares.data >= RecommendationService.SCORE_MINIMO)
+            linha, col, data = similares.row[manter], similares.col[manter], similares.data[manter]
+
+            # Ordena por (linha, -score) e mantém as k primeiras posições de cada linha
+            ordem = np.lexsort((-data, linha))
+            linha, col, data = linha[ordem], col[ordem], data[ordem]
+            inicio_linha = np.searchsorted(linha, linha, side='left')
+            top = (np.arange(len(linha)) - inicio_linha) < k
+
+            livros.append(alvo[linha[top]])
+            vizinhos.append(col[top])
+            scores.append(data[top])
+
+        if not livros:
+            vazio = np.empty(0, dtype=np.int64)
+            return vazio, vazio, np.empty(0, dtype=np.float32)
+        return np.concatenate(livros), np.concatenate(vizinhos), np.concatenate(scores)
+
+    @staticmethod
+    def _consultar(session, sql):
+        # Cursor do driver direto: com milhões de linhas, montar objetos Row do SQLAlchemy dobra o tempo
+        cursor = session.connection().connection.cursor()
+        try:
+            cursor.execute(sql)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _carregar_interacoes(session):
+        usuarios, livros, pesos = [], [], []
+
+        avaliacoes = RecommendationService._consultar(
+            session, "SELECT usuario_id, google_books_id, estrelas FROM avaliacoes"
+        )
+        if avaliacoes:
+            colunas = list(zip(*avaliacoes))
+            usuarios.extend(colunas[0])
+            livros.extend(colunas[1])
+            pesos.append(RecommendationService.peso_avaliacao(colunas[2]))
+
+        favoritos = RecommendationService._consultar(session, "SELECT usuario_id, google_books_id FROM favoritos")
+        if favoritos:
+            colunas = list(zip(*favoritos))
+            usuarios.extend(colunas[0])
+            livros.extend(colunas[1])
+        pesos.append(np.full(len(favoritos), RecommendationService.PESO_FAVORITO, dtype=np.float32))
+
+        return usuarios, livros, np.concatenate(pesos)
+
+    @staticmethod
+    def marcar_pendentes(session, google_books_ids):
+        """Marca livros para a próxima atualização incremental (na transação de quem chamou).
+
+        Avaliações já são marcadas por trigger; favoritos precisam chamar isto.
+        """
+        agora = time.time()
+        for google_books_id in set(google_books_ids):
+            session.execute(
+                insert(RecomendacaoPendente)
+                .values(google_books_id=google_books_id, marcado_em=agora)
+                .on_conflict_do_update(index_elements=['google_books_id'], set_={'marcado_em': agora})
+            )
+
+    @staticmethod
+    def atualizar(completo=False):
+        """Recalcula as listas de vizinhos.
+
+        Só mudam as similaridades que envolvem um livro pendente, então o modo
+        incremental recalcula os pendentes, os livros que os listavam e todos os
+        livros que agora têm similaridade com algum deles (o pendente pode entrar
+        no top-k de qualquer um desses). A matriz é sempre montada inteira, então
+        mesmo o modo incremental lê todas as interações do banco (o custo real de
+        cada etapa aparece em `flask recommendations-benchmark`).
+        """
+        calcular = RecommendationService.calcular_vizinhos
+        session = SessionLocal()
+        try:
+            corte = time.time()
+            pendentes = [row[0] for row in session.query(RecomendacaoPendente.google_books_id).filter(
+                RecomendacaoPendente.marcado_em <= corte
+            )]
+            if not completo and not pendentes:
+                return 0
+
+            matriz, ids_livros = RecommendationService.montar_matriz(
+                *RecommendationService._carregar_interacoes(session)
+            )
+
+            if completo:
+                livros, vizinhos, scores = calcular(matriz)
+                total = matriz.shape[1]
+                session.query(LivroVizinho).delete()
+            else:
+                # Livros pendentes sem nenhuma interação restante ficam sem lista
+                colunas_pendentes = np.flatnonzero(np.isin(ids_livros, pendentes))
+                livros, vizinhos, scores = calcular(matriz, colunas_pendentes)
+
+                similares = (matriz[:, colunas_pendentes].T @ matriz).tocoo()
+                afetados = set(ids_livros[np.unique(
+                    similares.col[similares.data >= RecommendationService.SCORE_MINIMO]
+                )].tolist())
+                for inicio in range(0, len(pendentes), 500):
+                    afetados.update(row[0] for row in session.query(LivroVizinho.google_books_id).filter(
+                        LivroVizinho.vizinho_id.in_(pendentes[inicio:inicio + 500])
+                    ).distinct())
+                afetados = sorted(afetados.difference(pendentes))
+
+                extras = calcular(matriz, np.flatnonzero(np.isin(ids_livros, afetados)))
+                livros, vizinhos, scores = (np.concatenate(par) for par in zip((livros, vizinhos, scores), extras))
+                total = len(pendentes) + len(afetados)
+
+                removidos = pendentes + afetados
+                for inicio in range(0, len(removidos), 500):
+                    session.query(LivroVizinho).filter(
+                        LivroVizinho.google_books_id.in_(removidos[inicio:inicio + 500])
+                    ).delete(synchronize_session=False)
+
+            if len(livros):
+                session.connection().exec_driver_sql(
+                    "INSERT INTO livros_vizinhos (google_books_id, vizinho_id, score) VALUES (?, ?, ?)",
+                    list(zip(ids_livros[livros].tolist(), ids_livros[vizinhos].tolist(), scores.tolist()))
+                )
+
+            session.query(RecomendacaoPendente).filter(
+                RecomendacaoPendente.marcado_em <= corte
+            ).delete(synchronize_session=False)
+            session.commit()
+            return total
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    @staticmethod
+    def _reservar_atualizacao(proxima_em=None):
+        """Reserva a atualização em segundo plano na tabela tarefas_agendadas.
+
+        Com vários workers só um consegue a reserva por intervalo. Sem `proxima_em`
+        tenta reservar agora e retorna se conseguiu; com `proxima_em` libera a
+        reserva marcando a próxima execução.
+        """
+        session = SessionLocal()
+        try:
+            tarefa = TarefaAgendada.nome == RecommendationService.TAREFA
+            if proxima_em is not None:
+                session.query(TarefaAgendada).filter(tarefa).update(
+                    {'proxima_em': proxima_em}, synchronize_session=False
+                )
+                session.commit()
+                return True
+
+            agora = time.time()
+            session.execute(
+                insert(TarefaAgendada)
+                .values(nome=RecommendationService.TAREFA, proxima_em=0)
+                .on_conflict_do_nothing(index_elements=['nome'])
+            )
+            reservadas = session.query(TarefaAgendada).filter(
+                tarefa, TarefaAgendada.proxima_em <= agora
+            ).update(
+                {'proxima_em': agora + RecommendationService.DURACAO_MAXIMA_ATUALIZACAO},
+                synchronize_session=False
+            )
+            session.commit()
+            return reservadas == 1
+        except Exception as e:
+            session.rollback()
+            print(f"Erro ao reservar atualização de recomendações: {e}")
+            return False
+        finally:
+            session.close()
+
+    @staticmethod
+    def _atualizar_em_segundo_plano():
+        try:
+            if RecommendationService._reservar_atualizacao():
+                try:
+                    RecommendationService.atualizar()
+                finally:
+                    RecommendationService._reservar_atualizacao(
+                        proxima_em=time.time() + RecommendationService.INTERVALO_ATUALIZACAO
+                    )
+        except Exception as e:
+            print(f"Erro ao atualizar recomendações: {e}")
+        finally:
+            with RecommendationService._lock:
+                RecommendationService._atualizando = False
+                RecommendationService._ultima_atualizacao = time.monotonic()
+
+    @staticmethod
+    def _agendar_atualizacao_se_vencida(session):
+        if time.monotonic() - RecommendationService._ultima_atualizacao < RecommendationService.INTERVALO_ATUALIZACAO:
+            return
+        if not session.query(RecomendacaoPendente.google_books_id).first():
+            return
+
+        with RecommendationService._lock:
+            if RecommendationService._atualizando:
+                return
+            RecommendationService._atualizando = True
+        RecommendationService._executor.submit(RecommendationService._atualizar_em_segundo_plano)
+
+    @staticmethod
+    def _limite(limite, padrao=10):
+        return max(1, min(limite or padrao, RecommendationService.MAX_LIMITE))
+
+    @staticmethod
+    def obter_similares(google_books_id, limite=10):
+        if not google_books_id or not google_books_id.strip():
+            raise BadRequestException("O ID do livro é obrigatório.")
+
+        session = SessionLocal()
+        try:
+            RecommendationService._agendar_atualizacao_se_vencida(session)
+            rows = session.query(LivroVizinho.vizinho_id, LivroVizinho.score).filter(
+                LivroVizinho.google_books_id == google_books_id
+            ).order_by(LivroVizinho.score.desc()).limit(RecommendationService._limite(limite)).all()
+
+            return {
+                'google_books_id': google_books_id,
+                'similares': [{'google_books_id': vizinho_id, 'score': round(score, 4)} for vizinho_id, score in rows]
+            }
+        finally:
+            session.close()
+
+    @staticmethod
+    def obter_recomendacoes_usuario(usuario_id, limite=10):
+        """Soma a similaridade dos vizinhos de tudo que o usuário avaliou bem ou favoritou,
+        descartando livros com os quais ele já interagiu."""
+        session = SessionLocal()
+        try:
+            if not session.query(User.id).filter_by(id=usuario_id).first():
+                raise BadRequestException("Usuário não encontrado.")
+
+            RecommendationService._agendar_atualizacao_se_vencida(session)
+            rows = session.execute(text(
+                """
+                WITH positivos AS (
+                    SELECT google_books_id FROM avaliacoes WHERE usuario_id = :usuario AND estrelas >= 3
+                    UNION
+                    SELECT google_books_id FROM favoritos WHERE usuario_id = :usuario
+                ),
+                conhecidos AS (
+                    SELECT google_books_id FROM avaliacoes WHERE usuario_id = :usuario
+                    UNION
+                    SELECT google_books_id FROM positivos
+                )
+                SELECT v.vizinho_id, SUM(v.score) AS score, COUNT(*) AS baseado_em
+                FROM livros_vizinhos v JOIN positivos p ON p.google_books_id = v.google_books_id
+                WHERE v.vizinho_id NOT IN (SELECT google_books_id FROM conhecidos)
+                GROUP BY v.vizinho_id
+                ORDER BY score DESC, baseado_em DESC
+                LIMIT :limite
+                """
+            ), {'usuario': usuario_id, 'limite': RecommendationService._limite(limite)}).all()
+
+            return {
+                'usuario_id': usuario_id,
+                'recomendacoes': [{
+                    'google_books_id': vizinho_id,
+                    'score': round(score, 4),
+                    'baseado_em': baseado_em
+                } for vizinho_id, score, baseado_em in rows]
+            }
+        finally:
+            session.close()
@@ -1,29 +1,174 @@
-logged_users = set()
+import os
+import time
+import threading
+from sqlalchemy import text
+from data.db import engine
+
+# Tempo de vida da sessão; cada uso renova o prazo (expiração deslizante)
+SESSION_TTL = int(os.environ.get('SESSION_TTL_SECONDS', 8 * 3600))
+# A renovação só é gravada se o último prazo tiver sido definido há mais que isso,
+# para que is_logged_in não vire uma escrita a cada requisição
+SESSION_REFRESH = int(os.environ.get('SESSION_REFRESH_SECONDS', 300))
+# O logout revoga os tokens emitidos antes dele; a marca precisa durar enquanto
+# esses tokens ainda poderiam ser válidos (AUTH_TOKEN_MAX_AGE em auth_service)
+REVOCATION_RETENTION = int(os.environ.get('AUTH_TOKEN_MAX_AGE', 8 * 3600))
+
+
+class MemorySessionStore:
+    """Sessões no próprio processo: rápido, mas cada worker enxerga só as suas."""
+
+    def __init__(self, ttl=SESSION_TTL, refresh=SESSION_REFRESH):
+        self.ttl = ttl
+        self.refresh = refresh
+        self._sessions = {}
+        self._revoked = {}
+        self._lock = threading.Lock()
+
+    def login(self, user_id):
+        with self._lock:
+            self._sessions[user_id] = time.time() + self.ttl
+
+    def logout(self, user_id):
+        with self._lock:
+            self._revoked[user_id] = time.time()
+            return self._sessions.pop(user_id, None) is not None
+
+    def revoked_at(self, user_id):
+        return self._revoked.get(user_id, 0)
+
+    def is_active(self, user_id):
+        now = time.time()
+        expires_at = self._sessions.get(user_id)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            with self._lock:
+                if self._sessions.get(user_id, now) <= now:
+                    self._sessions.pop(user_id, None)
+            return False
+        if expires_at - now < self.ttl - self.refresh:
+            self._sessions[user_id] = now + self.ttl
+        return True
+
+    def active_users(self):
+        now = time.time()
+        with self._lock:
+            return [user_id for user_id, expires_at in self._sessions.items() if expires_at > now]
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+            self._revoked.clear()
+
+
+class SQLiteSessionStore:
+    """Sessões na tabela `sessoes` do banco da aplicação, visíveis para todos os workers.
+
+    A verificação é uma leitura pela chave primária; escrita só no login, no
+    logout e na renovação (no máximo uma vez a cada `refresh` segundos). O logout
+    encerra a sessão e grava `revogado_em`, que invalida os tokens emitidos antes.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, refresh=SESSION_REFRESH, retention=REVOCATION_RETENTION):
+        self.ttl = ttl
+        self.refresh = refresh
+        self.retention = retention
+
+    def login(self, user_id):
+        now = time.time()
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO sessoes (usuario_id, expira_em) VALUES (:usuario, :expira) "
+                "ON CONFLICT(usuario_id) DO UPDATE SET expira_em = excluded.expira_em"
+            ), {"usuario": user_id, "expira": now + self.ttl})
+            # Limpeza oportunista das sessões vencidas (índice em expira_em), mantendo
+            # os logouts recentes enquanto os tokens revogados por eles não expiram
+            conn.execute(text(
+                "DELETE FROM sessoes WHERE expira_em <= :agora "
+                "AND (revogado_em IS NULL OR revogado_em <= :limite)"
+            ), {"agora": now, "limite": now - self.retention})
+
+    def logout(self, user_id):
+        now = time.time()
+        with engine.begin() as conn:
+            ativa = conn.execute(text(
+                "UPDATE sessoes SET expira_em = :agora, revogado_em = :agora "
+                "WHERE usuario_id = :usuario AND expira_em > :agora"
+            ), {"usuario": user_id, "agora": now}).rowcount > 0
+            if not ativa:
+                conn.execute(text(
+                    "INSERT INTO sessoes (usuario_id, expira_em, revogado_em) VALUES (:usuario, :agora, :agora) "
+                    "ON CONFLICT(usuario_id) DO UPDATE SET revogado_em = excluded.revogado_em"
+                ), {"usuario": user_id, "agora": now})
+            return ativa
+
+    def revoked_at(self, user_id):
+        with engine.connect() as conn:
+            return conn.execute(
+                text("SELECT revogado_em FROM sessoes WHERE usuario_id = :usuario"), {"usuario": user_id}
+            ).scalar() or 0
+
+    def is_active(self, user_id):
+        now = time.time()
+        with engine.connect() as conn:
+            expires_at = conn.execute(
+                text("SELECT expira_em FROM sessoes WHERE usuario_id = :usuario"), {"usuario": user_id}
+            ).scalar()
+
+        if expires_at is None or expires_at <= now:
+            return False
+        if expires_at - now < self.ttl - self.refresh:
+            with engine.begin() as conn:
+                conn.execute(
+                    text("UPDATE sessoes SET expira_em = :expira WHERE usuario_id = :usuario AND expira_em > :agora"),
+                    {"usuario": user_id, "expira": now + self.ttl, "agora": now}
+                )
+        return True
+
+    def active_users(self):
+        with engine.connect() as conn:
+            return list(conn.execute(
+                text("SELECT usuario_id FROM sessoes WHERE expira_em > :agora"), {"agora": time.time()}
+            ).scalars())
+
+    def clear(self):
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM sessoes"))
+
+
+SESSION_BACKENDS = {
+    'memory': MemorySessionStore,
+    'sqlite': SQLiteSessionStore,
+}
+
+
+def _create_store():
+    backend = os.environ.get('SESSION_BACKEND', 'sqlite').lower()
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"SESSION_BACKEND inválido: {backend}. Use: {', '.join(SESSION_BACKENDS)}")
+    return SESSION_BACKENDS[backend]()
+
+
+session_store = _create_store()
 
 
 def login_user(user_id):
-    logged_users.add(user_id)
-    print(f"[LOGIN] Usuário {user_id} está logado")
-    print(f"[INFO] Total de usuários logados: {len(logged_users)}")
+    session_store.login(user_id)
 
 
 def logout_user(user_id):
-    if user_id in logged_users:
-        logged_users.remove(user_id)
-        print(f"[LOGOUT] Usuário {user_id} saiu")
-        print(f"[INFO] Total de usuários logados: {len(logged_users)}")
-    else:
-        print(f"[AVISO] Tentativa de logout de usuário não logado: {user_id}")
+    return session_store.logout(user_id)
 
 
 def is_logged_in(user_id):
-    return user_id in logged_users
+    if not user_id:
+        return False
+    return session_store.is_active(user_id)
 
 
 def get_logged_users():
-    return list(logged_users)
+    return session_store.active_users()
 
 
 def clear_all_sessions():
-    logged_users.clear()
-    print("[INFO] Todas as sessões foram limpas")
\ No newline at end of file
+    session_store.clear()
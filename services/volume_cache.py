@@ -0,0 +1,73 @@
+import os
+import time
+from data.db import SessionLocal, LivroCache
+from services.catalog_service import CatalogService
+
+
+class VolumeCache:
+    TTL = int(os.environ.get('VOLUME_CACHE_TTL', 7 * 24 * 3600))
+    STALE_TTL = int(os.environ.get('VOLUME_CACHE_STALE_TTL', 30 * 24 * 3600))
+    NOT_FOUND_TTL = int(os.environ.get('VOLUME_CACHE_NOT_FOUND_TTL', 600))
+
+    @staticmethod
+    def _to_entry(entry):
+        age = time.time() - entry.atualizado_em
+        ttl = VolumeCache.NOT_FOUND_TTL if entry.status_code == 404 else VolumeCache.TTL
+
+        return {
+            'book': entry.dados,
+            'status_code': entry.status_code,
+            'fresh': age < ttl,
+            # Entradas vencidas ainda podem ser servidas enquanto a atualização roda em segundo plano
+            'usable': entry.status_code == 200 and age < ttl + VolumeCache.STALE_TTL
+        }
+
+    @staticmethod
+    def get(google_books_id):
+        session = SessionLocal()
+        try:
+            entry = session.get(LivroCache, google_books_id)
+            if not entry:
+                return None
+            return VolumeCache._to_entry(entry)
+        except Exception as e:
+            print(f"Erro ao ler cache de livros: {e}")
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    def get_many(google_books_ids):
+        if not google_books_ids:
+            return {}
+
+        session = SessionLocal()
+        try:
+            entries = session.query(LivroCache).filter(
+                LivroCache.google_books_id.in_(google_books_ids)
+            ).all()
+            return {entry.google_books_id: VolumeCache._to_entry(entry) for entry in entries}
+        except Exception as e:
+            print(f"Erro ao ler cache de livros: {e}")
+            return {}
+        finally:
+            session.close()
+
+    @staticmethod
+    def put(google_books_id, book, status_code=200):
+        session = SessionLocal()
+        try:
+            session.merge(LivroCache(
+                google_books_id=google_books_id,
+                dados=book,
+                status_code=status_code,
+                atualizado_em=time.time()
+            ))
+            # Todo volume visto alimenta o catálogo local de busca na mesma transação
+            CatalogService.index_book(session, google_books_id, book if status_code == 200 else None)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Erro ao gravar cache de livros: {e}")
+        finally:
+            session.close()
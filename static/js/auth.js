@@ -40,7 +40,7 @@ function setupLogoutButton(userId, username) {
       try{
         await fetch('/auth/logout', {
           method: 'POST',
-          headers: {'Content-Type':'application/json'},
+          headers: {'Content-Type':'application/json', 'Authorization': 'Bearer ' + localStorage.getItem('auth_token')},
           body: JSON.stringify({user_id: userId})
         });
       }catch(e){
@@ -48,6 +48,7 @@ function setupLogoutButton(userId, username) {
       }
 
       localStorage.removeItem('user_id');
+      localStorage.removeItem('auth_token');
       localStorage.removeItem('username');
       showToast('Você saiu com sucesso!', 'info', 'Até logo!');
 
@@ -117,6 +118,7 @@ export function initAuthForms() {
 
         if(res.ok){
           localStorage.setItem('user_id', data.user_id);
+          localStorage.setItem('auth_token', data.token);
           localStorage.setItem('username', data.username);
           showToast(`Bem-vindo(a), ${data.username}!`, 'success', 'Login realizado!');
 
@@ -194,7 +196,7 @@ export async function checkAuth() {
   if(userId){
     try{
       const res = await fetch('/auth/me', {
-        headers: { 'Authorization': 'Bearer ' + userId }
+        headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
       });
       const data = await res.json();
 
@@ -204,11 +206,13 @@ export async function checkAuth() {
         document.getElementById('username').textContent = username;
       }else{
         localStorage.removeItem('user_id');
+        localStorage.removeItem('auth_token');
         localStorage.removeItem('username');
       }
     }catch(e){
       console.error('Erro ao validar sessão:', e);
       localStorage.removeItem('user_id');
+      localStorage.removeItem('auth_token');
       localStorage.removeItem('username');
     }
   }
@@ -243,7 +247,7 @@ export function setupAuthButtons(isLoggedIn, userId, username) {
         try{
           await fetch('/auth/logout', {
             method: 'POST',
-            headers: {'Content-Type':'application/json'},
+            headers: {'Content-Type':'application/json', 'Authorization': 'Bearer ' + localStorage.getItem('auth_token')},
             body: JSON.stringify({user_id: userId})
           });
         }catch(e){
@@ -251,6 +255,7 @@ export function setupAuthButtons(isLoggedIn, userId, username) {
         }
 
         localStorage.removeItem('user_id');
+        localStorage.removeItem('auth_token');
         localStorage.removeItem('username');
         showToast('Você saiu com sucesso!', 'info', 'Até logo!');
 
@@ -35,7 +35,7 @@ window.loadBookDetails = async function(bookId, fromFavorites = false, fromRatin
     console.log('Fetching book details from:', `/api/books/${bookId}`);
     const res = await fetch(`/api/books/${bookId}`, {
       method: 'GET',
-      headers: { 'Authorization': 'Bearer ' + userId }
+      headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
     });
 
     console.log('Book details response status:', res.status);
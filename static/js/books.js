@@ -1,5 +1,8 @@
 // books.js - Busca e Exibição de Livros
 
+// Campos usados pelos cards da busca; o restante do livro só é carregado nos detalhes
+const SEARCH_CARD_FIELDS = ['title', 'authors', 'publishedDate', 'description', 'imageLinks.thumbnail', 'imageLinks.smallThumbnail'];
+
 // Função buscar livros
 async function searchBooks(query){
   const userId = localStorage.getItem('user_id');
@@ -23,9 +26,9 @@ async function searchBooks(query){
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
-        'Authorization': 'Bearer ' + userId
+        'Authorization': 'Bearer ' + localStorage.getItem('auth_token')
       },
-      body: JSON.stringify({ findBook: query })
+      body: JSON.stringify({ findBook: query, fields: SEARCH_CARD_FIELDS })
     });
 
     console.log('Response status:', res.status);
@@ -70,6 +70,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
     chatbotMessages.appendChild(messageDiv);
     chatbotMessages.scrollTop = chatbotMessages.scrollHeight;
+    return messageDiv.querySelector('.message-content p');
   }
 
   // Função para adicionar loading
@@ -99,6 +100,69 @@ document.addEventListener('DOMContentLoaded', function() {
     }
   }
 
+  function showError(errorMsg) {
+    // Mostrar erro específico do backend
+    errorMsg = errorMsg || 'Desculpe, ocorreu um erro. Por favor, tente novamente.';
+    console.error('Erro do backend:', errorMsg);
+
+    if (errorMsg.includes('GROQ_API_KEY') || errorMsg.includes('API key')) {
+      addMessage('⚠️ Chatbot não configurado. Entre em contato com o administrador para configurar a GROQ_API_KEY.', false);
+    } else {
+      addMessage('Desculpe, ocorreu um erro: ' + errorMsg, false);
+    }
+  }
+
+  // Ler a resposta em Server-Sent Events e ir preenchendo a mensagem do bot
+  async function renderStream(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let bubble = null;
+    let text = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Eventos SSE terminam com uma linha em branco
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let eventName = 'message';
+        let payload = '';
+        rawEvent.split('\n').forEach(line => {
+          if (line.startsWith('event:')) eventName = line.slice(6).trim();
+          else if (line.startsWith('data:')) payload += line.slice(5).trim();
+        });
+        const data = payload ? JSON.parse(payload) : {};
+
+        if (eventName === 'error') {
+          removeLoading();
+          showError(data.error);
+          return;
+        }
+        if (eventName === 'done') {
+          break;
+        }
+        if (data.delta) {
+          if (!bubble) {
+            removeLoading();
+            bubble = addMessage('', false);
+          }
+          text += data.delta;
+          bubble.innerHTML = text;
+          chatbotMessages.scrollTop = chatbotMessages.scrollHeight;
+        }
+      }
+    }
+
+    removeLoading();
+    if (!bubble) showError();
+  }
+
   // Enviar mensagem
   async function sendMessage() {
     const message = chatbotInput.value.trim();
@@ -117,11 +181,18 @@ document.addEventListener('DOMContentLoaded', function() {
       const response = await fetch('/api/chat', {
         method: 'POST',
         headers: {
-          'Content-Type': 'application/json'
+          'Content-Type': 'application/json',
+          'Accept': 'text/event-stream'
         },
-        body: JSON.stringify({ message: message })
+        body: JSON.stringify({ message: message, stream: true })
       });
 
+      const contentType = response.headers.get('Content-Type') || '';
+      if (response.ok && contentType.includes('text/event-stream')) {
+        await renderStream(response);
+        return;
+      }
+
       const data = await response.json();
 
       removeLoading();
@@ -129,15 +200,7 @@ document.addEventListener('DOMContentLoaded', function() {
       if (response.ok && data.answer) {
         addMessage(data.answer, false);
       } else {
-        // Mostrar erro específico do backend
-        const errorMsg = data.error || 'Desculpe, ocorreu um erro. Por favor, tente novamente.';
-        console.error('Erro do backend:', errorMsg);
-
-        if (errorMsg.includes('GROQ_API_KEY') || errorMsg.includes('API key')) {
-          addMessage('⚠️ Chatbot não configurado. Entre em contato com o administrador para configurar a GROQ_API_KEY.', false);
-        } else {
-          addMessage('Desculpe, ocorreu um erro: ' + errorMsg, false);
-        }
+        showError(data.error);
       }
     } catch (error) {
       console.error('Erro ao enviar mensagem:', error);
@@ -180,6 +180,41 @@ function showConfirm(title, message, onConfirm, onCancel = null) {
   modal.style.display = 'flex';
 }
 
+// Buscar vários livros em lotes (favoritos, avaliações)
+async function fetchBooksBatch(bookIds) {
+  // O servidor aceita no máximo 250 IDs por requisição (BATCH_MAX_IDS)
+  const maxIds = 250;
+  const ids = [...new Set(bookIds)];
+  const chunks = [];
+  for (let i = 0; i < ids.length; i += maxIds) {
+    chunks.push(ids.slice(i, i + maxIds));
+  }
+
+  const pages = await Promise.all(chunks.map(async chunk => {
+    const res = await fetch('/api/books/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        ids: chunk,
+        include_avaliacoes: false,
+        fields: ['title', 'authors', 'imageLinks.thumbnail', 'imageLinks.smallThumbnail']
+      })
+    });
+    const data = await res.json();
+
+    if (!res.ok) {
+      throw new Error(data.error || 'Erro ao carregar livros');
+    }
+    return data.books || [];
+  }));
+
+  const booksById = {};
+  pages.flat().forEach(item => {
+    booksById[item.id] = item.book;
+  });
+  return booksById;
+}
+
 // Função global para abrir modal de avaliação
 window.openRatingModal = function(bookId, currentStars = 0, currentComment = '', isEditing = false) {
   const userId = localStorage.getItem('user_id');
@@ -390,7 +425,7 @@ window.saveRating = async function(bookId, stars, comment, reopenRatingsModal =
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
-        'Authorization': 'Bearer ' + userId
+        'Authorization': 'Bearer ' + localStorage.getItem('auth_token')
       },
       body: JSON.stringify(payload)
     });
@@ -419,7 +454,7 @@ document.addEventListener('DOMContentLoaded', async ()=>{
   // Verificar se está logado (mas não redirecionar se não estiver)
   if(userId){
     try{
-      const res = await fetch('/auth/me', { headers: { 'Authorization': 'Bearer '+userId }});
+      const res = await fetch('/auth/me', { headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }});
       const data = await res.json();
       if(res.ok){
         isLoggedIn = true;
@@ -427,11 +462,13 @@ document.addEventListener('DOMContentLoaded', async ()=>{
         document.getElementById('username').textContent = username;
       }else{
         localStorage.removeItem('user_id');
+        localStorage.removeItem('auth_token');
         localStorage.removeItem('username');
       }
     }catch(e){
       console.error('Erro ao validar sessão:', e);
       localStorage.removeItem('user_id');
+      localStorage.removeItem('auth_token');
       localStorage.removeItem('username');
     }
   }
@@ -461,13 +498,14 @@ document.addEventListener('DOMContentLoaded', async ()=>{
         try{
           await fetch('/auth/logout', {
             method: 'POST',
-            headers: {'Content-Type':'application/json'},
+            headers: {'Content-Type':'application/json', 'Authorization': 'Bearer ' + localStorage.getItem('auth_token')},
             body: JSON.stringify({user_id: userId})
           });
         }catch(e){
           console.error('Erro ao fazer logout:', e);
         }
         localStorage.removeItem('user_id');
+        localStorage.removeItem('auth_token');
         localStorage.removeItem('username');
         showToast('Você saiu com sucesso!', 'info', 'Até logo!');
 
@@ -553,6 +591,9 @@ document.addEventListener('DOMContentLoaded', async ()=>{
     });
   }
 
+  // Campos usados pelos cards da busca; o restante do livro só é carregado nos detalhes
+  const SEARCH_CARD_FIELDS = ['title', 'authors', 'publishedDate', 'description', 'imageLinks.thumbnail', 'imageLinks.smallThumbnail'];
+
   // Função buscar livros
   async function searchBooks(query){
     console.log('searchBooks called with query:', query);
@@ -572,9 +613,9 @@ document.addEventListener('DOMContentLoaded', async ()=>{
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Authorization': 'Bearer ' + userId
+          'Authorization': 'Bearer ' + localStorage.getItem('auth_token')
         },
-        body: JSON.stringify({ findBook: query })
+        body: JSON.stringify({ findBook: query, fields: SEARCH_CARD_FIELDS })
       });
 
       console.log('Response status:', res.status);
@@ -640,6 +681,7 @@ document.addEventListener('DOMContentLoaded', async ()=>{
             <p class="book-description">${shortDescription}</p>
             <div class="book-card-footer">
               <span class="book-card-cta">Ver detalhes →</span>
+              <button class="book-card-fav" data-book-id="${book.id}" title="Favoritar" onclick="event.stopPropagation(); toggleFavoriteCard(this)">♡</button>
             </div>
           </div>
         </div>
@@ -648,8 +690,72 @@ document.addEventListener('DOMContentLoaded', async ()=>{
 
     resultsContainer.innerHTML = `<div class="books-grid">${booksHTML}</div>`;
     console.log('Livros exibidos com sucesso em grid');
+    markFavoritedCards(books.map(book => book.id));
   }
 
+  // Marcar os cards já favoritados com uma única requisição para a página inteira
+  async function markFavoritedCards(bookIds){
+    const userId = localStorage.getItem('user_id');
+    if(!userId || bookIds.length === 0) return;
+
+    try{
+      const res = await fetch(`/api/users/${userId}/favorites/check`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': 'Bearer ' + localStorage.getItem('auth_token')
+        },
+        body: JSON.stringify({ book_ids: bookIds })
+      });
+      if(!res.ok) return;
+      const data = await res.json();
+      const favorited = new Set(data.favorited || []);
+      resultsContainer.querySelectorAll('.book-card-fav').forEach(btn => {
+        setFavoriteButton(btn, favorited.has(btn.dataset.bookId));
+      });
+    }catch(e){
+      console.error('Erro ao verificar favoritos:', e);
+    }
+  }
+
+  function setFavoriteButton(btn, isFavorite){
+    btn.classList.toggle('active', isFavorite);
+    btn.textContent = isFavorite ? '♥' : '♡';
+    btn.title = isFavorite ? 'Remover dos favoritos' : 'Favoritar';
+  }
+
+  window.toggleFavoriteCard = async function(btn){
+    const userId = localStorage.getItem('user_id');
+    if(!userId){
+      showToast('Faça login para adicionar livros aos favoritos', 'warning', 'Login necessário');
+      setTimeout(() => window.openAuthModal('login'), 500);
+      return;
+    }
+
+    const bookId = btn.dataset.bookId;
+    const isFavorite = btn.classList.contains('active');
+    setFavoriteButton(btn, !isFavorite);
+
+    try{
+      const res = await fetch(`/api/users/${userId}/favorites/batch`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': 'Bearer ' + localStorage.getItem('auth_token')
+        },
+        body: JSON.stringify(isFavorite ? { remove: [bookId] } : { add: [bookId] })
+      });
+      if(!res.ok){
+        const data = await res.json();
+        setFavoriteButton(btn, isFavorite);
+        showToast(data.error || 'Erro ao atualizar favoritos', 'error');
+      }
+    }catch(e){
+      setFavoriteButton(btn, isFavorite);
+      showToast('Erro: ' + e.message, 'error');
+    }
+  };
+
   // Carregar detalhes
   window.loadBookDetails = async function(bookId, fromFavorites = false, fromRatings = false){
     console.log('loadBookDetails called with bookId:', bookId, 'fromFavorites:', fromFavorites, 'fromRatings:', fromRatings);
@@ -678,7 +784,7 @@ document.addEventListener('DOMContentLoaded', async ()=>{
       console.log('Fetching book details from:', `/api/books/${bookId}`);
       const res = await fetch(`/api/books/${bookId}`, {
         method: 'GET',
-        headers: { 'Authorization': 'Bearer ' + userId }
+        headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
       });
 
       console.log('Book details response status:', res.status);
@@ -800,7 +906,7 @@ document.addEventListener('DOMContentLoaded', async ()=>{
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
-          'Authorization': 'Bearer ' + currentUserId
+          'Authorization': 'Bearer ' + localStorage.getItem('auth_token')
         },
         body: JSON.stringify({ book_id: bookId })
       });
@@ -825,7 +931,9 @@ document.addEventListener('DOMContentLoaded', async ()=>{
 
     // Verificar se o usuário já avaliou este livro
     try {
-      const res = await fetch(`/api/ratings/${bookId}/check?user_id=${currentUserId}`);
+      const res = await fetch(`/api/ratings/${bookId}/check?user_id=${currentUserId}`, {
+        headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
+      });
       const data = await res.json();
 
       if(res.ok && data.ja_avaliou) {
@@ -922,6 +1030,7 @@ document.addEventListener('DOMContentLoaded', async ()=>{
 
         if(res.ok){
           localStorage.setItem('user_id', data.user_id);
+          localStorage.setItem('auth_token', data.token);
           localStorage.setItem('username', data.username);
           showToast(`Bem-vindo(a), ${data.username}!`, 'success', 'Login realizado!');
 
@@ -965,13 +1074,14 @@ document.addEventListener('DOMContentLoaded', async ()=>{
               try{
                 await fetch('/auth/logout', {
                   method: 'POST',
-                  headers: {'Content-Type':'application/json'},
+                  headers: {'Content-Type':'application/json', 'Authorization': 'Bearer ' + localStorage.getItem('auth_token')},
                   body: JSON.stringify({user_id: data.user_id})
                 });
               }catch(e){
                 console.error('Erro ao fazer logout:', e);
               }
               localStorage.removeItem('user_id');
+              localStorage.removeItem('auth_token');
               localStorage.removeItem('username');
               showToast('Você saiu com sucesso!', 'info', 'Até logo!');
 
@@ -1099,7 +1209,9 @@ window.showFavorites = async function() {
   modal.style.display = 'flex';
 
   try {
-    const res = await fetch(`/api/users/${userId}/favorites`);
+    const res = await fetch(`/api/users/${userId}/favorites`, {
+      headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
+    });
     const data = await res.json();
 
     if (!res.ok) {
@@ -1117,15 +1229,11 @@ window.showFavorites = async function() {
       return;
     }
 
-    // Buscar detalhes de cada livro favorito
-    const bookPromises = data.favorite_books.map(bookId =>
-      fetch(`/api/books/${bookId}`).then(r => r.json())
-    );
-
-    const books = await Promise.all(bookPromises);
+    // Buscar detalhes de todos os livros favoritos em uma única requisição
+    const booksById = await fetchBooksBatch(data.favorite_books);
 
-    content.innerHTML = books.map(book => {
-      const bookData = book.book || book;
+    content.innerHTML = data.favorite_books.map(bookId => {
+      const bookData = booksById[bookId] || { id: bookId };
       const thumbnail = bookData.imageLinks?.thumbnail || bookData.imageLinks?.smallThumbnail || '/static/img/book-placeholder.png';
       const title = bookData.title || 'Título desconhecido';
       const authors = bookData.authors ? bookData.authors.join(', ') : 'Autor desconhecido';
@@ -1164,7 +1272,8 @@ async function removeFavorite(bookId) {
     async () => {
       try {
         const res = await fetch(`/api/users/${userId}/favorites/${bookId}`, {
-          method: 'DELETE'
+          method: 'DELETE',
+          headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
         });
 
         const data = await res.json();
@@ -1201,12 +1310,25 @@ window.showRatings = async function() {
   ratingsModal.style.display = 'flex';
 
   try {
-    const res = await fetch(`/api/ratings/user/${userId}`);
-    const data = await res.json();
+    // A listagem é paginada por cursor; percorrer as páginas até o fim
+    const data = { ratings: [] };
+    let cursor = null;
+    do {
+      const params = new URLSearchParams({ limite: 100 });
+      if (cursor) params.set('cursor', cursor);
+
+      const res = await fetch(`/api/ratings/user/${userId}?${params}`, {
+        headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
+      });
+      const page = await res.json();
 
-    if (!res.ok) {
-      throw new Error(data.error || 'Erro ao carregar avaliações');
-    }
+      if (!res.ok) {
+        throw new Error(page.error || 'Erro ao carregar avaliações');
+      }
+
+      data.ratings.push(...page.ratings);
+      cursor = page.next_cursor;
+    } while (cursor);
 
     if (!data.ratings || data.ratings.length === 0) {
       ratingsList.innerHTML = `
@@ -1219,16 +1341,11 @@ window.showRatings = async function() {
       return;
     }
 
-    // Buscar detalhes de cada livro avaliado
-    const bookPromises = data.ratings.map(rating =>
-      fetch(`/api/books/${rating.google_books_id}`).then(r => r.json())
-    );
-
-    const books = await Promise.all(bookPromises);
+    // Buscar detalhes de todos os livros avaliados em uma única requisição
+    const booksById = await fetchBooksBatch(data.ratings.map(rating => rating.google_books_id));
 
-    ratingsList.innerHTML = data.ratings.map((rating, index) => {
-      const book = books[index];
-      const bookData = book.book || book;
+    ratingsList.innerHTML = data.ratings.map(rating => {
+      const bookData = booksById[rating.google_books_id] || { id: rating.google_books_id };
       const thumbnail = bookData.imageLinks?.thumbnail || bookData.imageLinks?.smallThumbnail || '/static/img/book-placeholder.png';
       const title = bookData.title || 'Título desconhecido';
       const authors = bookData.authors ? bookData.authors.join(', ') : 'Autor desconhecido';
@@ -1307,7 +1424,8 @@ window.deleteRating = async function(bookId) {
     async () => {
       try {
         const res = await fetch(`/api/ratings/${bookId}?user_id=${userId}`, {
-          method: 'DELETE'
+          method: 'DELETE',
+          headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
         });
 
         const data = await res.json();
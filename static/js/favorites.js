@@ -16,7 +16,9 @@ window.showFavorites = async function() {
   modal.style.display = 'flex';
 
   try {
-    const res = await fetch(`/api/users/${userId}/favorites`);
+    const res = await fetch(`/api/users/${userId}/favorites`, {
+      headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
+    });
     const data = await res.json();
 
     if (!res.ok) {
@@ -34,15 +36,11 @@ window.showFavorites = async function() {
       return;
     }
 
-    // Buscar detalhes de cada livro favorito
-    const bookPromises = data.favorite_books.map(bookId =>
-      fetch(`/api/books/${bookId}`).then(r => r.json())
-    );
-
-    const books = await Promise.all(bookPromises);
+    // Buscar detalhes de todos os livros favoritos em uma única requisição
+    const booksById = await fetchBooksBatch(data.favorite_books);
 
-    content.innerHTML = books.map(book => {
-      const bookData = book.book || book;
+    content.innerHTML = data.favorite_books.map(bookId => {
+      const bookData = booksById[bookId] || { id: bookId };
       const thumbnail = bookData.imageLinks?.thumbnail || bookData.imageLinks?.smallThumbnail || '/static/img/book-placeholder.png';
       const title = bookData.title || 'Título desconhecido';
       const authors = bookData.authors ? bookData.authors.join(', ') : 'Autor desconhecido';
@@ -81,7 +79,8 @@ window.removeFavorite = async function(bookId) {
     async () => {
       try {
         const res = await fetch(`/api/users/${userId}/favorites/${bookId}`, {
-          method: 'DELETE'
+          method: 'DELETE',
+          headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
         });
 
         const data = await res.json();
@@ -115,7 +114,7 @@ window.addToFavorites = async function(bookId){
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
-        'Authorization': 'Bearer ' + currentUserId
+        'Authorization': 'Bearer ' + localStorage.getItem('auth_token')
       },
       body: JSON.stringify({ book_id: bookId })
     });
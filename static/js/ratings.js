@@ -199,7 +199,7 @@ window.saveRating = async function(bookId, stars, comment, reopenRatingsModal =
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
-        'Authorization': 'Bearer ' + userId
+        'Authorization': 'Bearer ' + localStorage.getItem('auth_token')
       },
       body: JSON.stringify(payload)
     });
@@ -235,12 +235,25 @@ window.showRatings = async function() {
   ratingsModal.style.display = 'flex';
 
   try {
-    const res = await fetch(`/api/ratings/user/${userId}`);
-    const data = await res.json();
+    // A listagem é paginada por cursor; percorrer as páginas até o fim
+    const data = { ratings: [] };
+    let cursor = null;
+    do {
+      const params = new URLSearchParams({ limite: 100 });
+      if (cursor) params.set('cursor', cursor);
+
+      const res = await fetch(`/api/ratings/user/${userId}?${params}`, {
+        headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
+      });
+      const page = await res.json();
 
-    if (!res.ok) {
-      throw new Error(data.error || 'Erro ao carregar avaliações');
-    }
+      if (!res.ok) {
+        throw new Error(page.error || 'Erro ao carregar avaliações');
+      }
+
+      data.ratings.push(...page.ratings);
+      cursor = page.next_cursor;
+    } while (cursor);
 
     if (!data.ratings || data.ratings.length === 0) {
       ratingsList.innerHTML = `
@@ -253,16 +266,11 @@ window.showRatings = async function() {
       return;
     }
 
-    // Buscar detalhes de cada livro avaliado
-    const bookPromises = data.ratings.map(rating =>
-      fetch(`/api/books/${rating.google_books_id}`).then(r => r.json())
-    );
-
-    const books = await Promise.all(bookPromises);
+    // Buscar detalhes de todos os livros avaliados em uma única requisição
+    const booksById = await fetchBooksBatch(data.ratings.map(rating => rating.google_books_id));
 
-    ratingsList.innerHTML = data.ratings.map((rating, index) => {
-      const book = books[index];
-      const bookData = book.book || book;
+    ratingsList.innerHTML = data.ratings.map(rating => {
+      const bookData = booksById[rating.google_books_id] || { id: rating.google_books_id };
       const thumbnail = bookData.imageLinks?.thumbnail || bookData.imageLinks?.smallThumbnail || '/static/img/book-placeholder.png';
       const title = bookData.title || 'Título desconhecido';
       const authors = bookData.authors ? bookData.authors.join(', ') : 'Autor desconhecido';
@@ -339,7 +347,8 @@ window.deleteRating = async function(bookId) {
     async () => {
       try {
         const res = await fetch(`/api/ratings/${bookId}?user_id=${userId}`, {
-          method: 'DELETE'
+          method: 'DELETE',
+          headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
         });
 
         const data = await res.json();
@@ -370,7 +379,9 @@ window.rateBook = async function(bookId){
 
   // Verificar se o usuário já avaliou este livro
   try {
-    const res = await fetch(`/api/ratings/${bookId}/check?user_id=${currentUserId}`);
+    const res = await fetch(`/api/ratings/${bookId}/check?user_id=${currentUserId}`, {
+      headers: { 'Authorization': 'Bearer ' + localStorage.getItem('auth_token') }
+    });
     const data = await res.json();
 
     if(res.ok && data.ja_avaliou) {
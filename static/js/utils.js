@@ -182,7 +182,43 @@ function showConfirm(title, message, onConfirm, onCancel = null) {
   modal.style.display = 'flex';
 }
 
+// Buscar vários livros em lotes (favoritos, avaliações)
+async function fetchBooksBatch(bookIds) {
+  // O servidor aceita no máximo 250 IDs por requisição (BATCH_MAX_IDS)
+  const maxIds = 250;
+  const ids = [...new Set(bookIds)];
+  const chunks = [];
+  for (let i = 0; i < ids.length; i += maxIds) {
+    chunks.push(ids.slice(i, i + maxIds));
+  }
+
+  const pages = await Promise.all(chunks.map(async chunk => {
+    const res = await fetch('/api/books/batch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        ids: chunk,
+        include_avaliacoes: false,
+        fields: ['title', 'authors', 'imageLinks.thumbnail', 'imageLinks.smallThumbnail']
+      })
+    });
+    const data = await res.json();
+
+    if (!res.ok) {
+      throw new Error(data.error || 'Erro ao carregar livros');
+    }
+    return data.books || [];
+  }));
+
+  const booksById = {};
+  pages.flat().forEach(item => {
+    booksById[item.id] = item.book;
+  });
+  return booksById;
+}
+
 // Exportar funções para uso global
 window.showToast = showToast;
 window.showConfirm = showConfirm;
+window.fetchBooksBatch = fetchBooksBatch;
 
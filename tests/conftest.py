@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Os módulos da aplicação são importados a partir da raiz do projeto (data, services, ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,27 @@
+from services.lru_cache import LRUCache
+
+
+def test_ttl_zero_nao_guarda():
+    cache = LRUCache(ttl=60)
+    cache.set('a', 1)
+    cache.set('a', 2, ttl=0)
+    assert cache.get('a') is None
+
+    cache.get_or_load('b', lambda: 3, ttl=lambda valor: 0)
+    assert cache.get('b') is None
+
+
+def test_ttl_padrao_e_explicito():
+    cache = LRUCache(ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=5)
+    assert cache.get('a') == 1
+    assert cache.get('b') == 2
+
+
+def test_valor_grande_demais_remove_o_antigo():
+    cache = LRUCache(max_bytes=10)
+    cache.set('a', 'curto')
+    cache.set('a', 'x' * 100)
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == 0
@@ -0,0 +1,81 @@
+import random
+
+import pytest
+from sqlalchemy import create_engine
+
+import data.db as db
+from data.db import Base, SessionLocal, User, Favorito, Avaliacao, LivroVizinho
+from services.recommendation_service import RecommendationService
+
+LIVROS = [f'livro{i}' for i in range(40)]
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco SQLite temporário com 60 usuários e interações aleatórias."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'recomendacoes.db'}")
+    Base.metadata.create_all(engine)
+    SessionLocal.configure(bind=engine)
+
+    rng = random.Random(18)
+    session = SessionLocal()
+    usuarios = [User(username=f'usuario{i}', email=f'u{i}@teste.com', password='x') for i in range(60)]
+    session.add_all(usuarios)
+    session.flush()
+    for usuario in usuarios:
+        for livro in rng.sample(LIVROS, 4):
+            session.add(Favorito(usuario_id=usuario.id, google_books_id=livro))
+        for livro in rng.sample(LIVROS, 3):
+            session.add(Avaliacao(google_books_id=livro, usuario_id=usuario.id, estrelas=rng.randint(1, 5)))
+    session.commit()
+    ids = [usuario.id for usuario in usuarios]
+    session.close()
+
+    yield ids, rng
+
+    SessionLocal.configure(bind=db.engine)
+    engine.dispose()
+
+
+def vizinhos():
+    session = SessionLocal()
+    try:
+        return sorted(
+            (livro, vizinho, round(score, 5))
+            for livro, vizinho, score in session.query(
+                LivroVizinho.google_books_id, LivroVizinho.vizinho_id, LivroVizinho.score
+            )
+        )
+    finally:
+        session.close()
+
+
+def alterar(usuarios, rng):
+    """Adiciona ou remove um favorito ou uma avaliação e marca o livro como pendente."""
+    session = SessionLocal()
+    usuario, livro = rng.choice(usuarios), rng.choice(LIVROS)
+    modelo = rng.choice([Favorito, Avaliacao])
+    existente = session.query(modelo).filter_by(usuario_id=usuario, google_books_id=livro).first()
+    if existente:
+        session.delete(existente)
+    elif modelo is Favorito:
+        session.add(Favorito(usuario_id=usuario, google_books_id=livro))
+    else:
+        session.add(Avaliacao(google_books_id=livro, usuario_id=usuario, estrelas=rng.randint(1, 5)))
+    RecommendationService.marcar_pendentes(session, [livro])
+    session.commit()
+    session.close()
+
+
+def test_incremental_igual_ao_completo(banco, monkeypatch):
+    usuarios, rng = banco
+    monkeypatch.setattr(RecommendationService, 'K', 3)
+    RecommendationService.atualizar(completo=True)
+
+    for _ in range(40):
+        for _ in range(rng.randint(1, 3)):
+            alterar(usuarios, rng)
+        RecommendationService.atualizar()
+        incremental = vizinhos()
+        RecommendationService.atualizar(completo=True)
+        assert incremental == vizinhos()
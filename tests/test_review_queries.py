@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+
+import data.db as db
+from data.db import Base, SessionLocal, User, Avaliacao
+from services.book_service import BookService
+from services.rating_service import RatingService
+
+LIVRO_A = 'livro-a'
+LIVRO_B = 'livro-b'
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco SQLite temporário com 30 avaliações do livro A e 3 do livro B."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'avaliacoes.db'}")
+    Base.metadata.create_all(engine)
+    SessionLocal.configure(bind=engine)
+
+    session = SessionLocal()
+    usuarios = [User(username=f'usuario{i}', email=f'u{i}@teste.com', password='x') for i in range(30)]
+    session.add_all(usuarios)
+    session.flush()
+
+    inicio = datetime(2024, 1, 1)
+    for i, usuario in enumerate(usuarios):
+        session.add(Avaliacao(google_books_id=LIVRO_A, usuario_id=usuario.id, estrelas=i % 5 + 1,
+                              comentario=f'comentário {i}', data_avaliacao=inicio + timedelta(minutes=i)))
+    for i, usuario in enumerate(usuarios[:3]):
+        session.add(Avaliacao(google_books_id=LIVRO_B, usuario_id=usuario.id, estrelas=4,
+                              data_avaliacao=inicio + timedelta(minutes=i)))
+    session.commit()
+    session.close()
+
+    yield engine
+
+    SessionLocal.configure(bind=db.engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def contar_comandos(banco):
+    comandos = []
+
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(statement)
+
+    event.listen(banco, 'before_cursor_execute', registrar)
+    yield comandos
+    event.remove(banco, 'before_cursor_execute', registrar)
+
+
+def _primeiro_usuario():
+    session = SessionLocal()
+    try:
+        return session.query(User.id).filter_by(username='usuario0').scalar()
+    finally:
+        session.close()
+
+
+def test_obter_avaliacoes_usa_um_comando_por_pagina(contar_comandos):
+    session = SessionLocal()
+    try:
+        service = RatingService(session)
+
+        pagina = service.obter_avaliacoes(LIVRO_A, limite=10)
+        assert len(contar_comandos) == 1
+        assert len(pagina['avaliacoes']) == 10
+        assert pagina['avaliacoes'][0]['usuario_nome'] == 'usuario29'
+
+        contar_comandos.clear()
+        seguinte = service.obter_avaliacoes(LIVRO_A, limite=10, cursor=pagina['next_cursor'])
+        assert len(contar_comandos) == 1
+        assert seguinte['avaliacoes'][0]['usuario_nome'] == 'usuario19'
+    finally:
+        session.close()
+
+
+def test_obter_avaliacoes_usuario_usa_um_comando(contar_comandos):
+    usuario_id = _primeiro_usuario()
+    contar_comandos.clear()
+
+    session = SessionLocal()
+    try:
+        resultado = RatingService(session).obter_avaliacoes_usuario(usuario_id)
+    finally:
+        session.close()
+
+    assert len(contar_comandos) == 1
+    assert {avaliacao['google_books_id'] for avaliacao in resultado['avaliacoes']} == {LIVRO_A, LIVRO_B}
+
+
+def test_get_avaliacoes_usa_um_comando(contar_comandos):
+    avaliacoes, next_cursor = BookService._get_avaliacoes(LIVRO_A, limite=5)
+
+    assert len(contar_comandos) == 1
+    assert [avaliacao['usuario_nome'] for avaliacao in avaliacoes] == [f'usuario{i}' for i in range(29, 24, -1)]
+    assert next_cursor
+
+
+def test_get_avaliacoes_many_usa_um_comando_e_limita_por_livro(contar_comandos):
+    resultado = BookService._get_avaliacoes_many([LIVRO_A, LIVRO_B, 'sem-avaliacoes'], limite=5)
+
+    assert len(contar_comandos) == 1
+    assert len(resultado[LIVRO_A]) == 5
+    assert resultado[LIVRO_A][0]['usuario_nome'] == 'usuario29'
+    assert len(resultado[LIVRO_B]) == 3
+    assert resultado['sem-avaliacoes'] == []
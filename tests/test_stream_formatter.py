@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from services.chat_service import ChatService, StreamFormatter
+
+EXEMPLOS = [
+    "* **Duna** - de *Frank Herbert*\n* **Fundação** - Asimov",
+    "`pip\ninstall`",
+    "Instale com:\n```bash\npip install flask\n```\nPronto.",
+    "Use `x` e **y**, depois *z* e ***w***.",
+    "  \n\n\n\nOlá,   mundo * sem par\n\n\n  ",
+    "`` vazio `a` ``` `b`",
+]
+
+PEDACOS = ['a', 'bc', ' ', '*', '**', '`', '```', '\n', '\n\n\n', ' \n', '\t', 'Duna']
+
+
+def transmitir(texto, rng):
+    formatter = StreamFormatter()
+    saida = ''
+    i = 0
+    while i < len(texto):
+        fim = i + rng.randint(1, 6)
+        saida += formatter.feed(texto[i:fim])
+        i = fim
+    return saida + formatter.flush()
+
+
+@pytest.mark.parametrize('texto', EXEMPLOS)
+def test_exemplos_em_qualquer_divisao(texto):
+    rng = random.Random(texto)
+    esperado = ChatService.format_response(texto)
+    for _ in range(300):
+        assert transmitir(texto, rng) == esperado
+
+
+def test_textos_aleatorios():
+    rng = random.Random(24)
+    for _ in range(3000):
+        texto = ''.join(rng.choice(PEDACOS) for _ in range(rng.randint(0, 30)))
+        assert transmitir(texto, rng) == ChatService.format_response(texto), repr(texto)
+
+
+def test_texto_sem_marcador_sai_na_hora():
+    formatter = StreamFormatter()
+    assert formatter.feed('Olá') == 'Olá'
+    assert formatter.feed(' mundo *Du') == ' mundo'
+    assert formatter.feed('na*\n') == ' Duna'
+    assert formatter.flush() == '<br>'